@@ -1,19 +1,43 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime, timedelta
+from typing import Dict, List, Optional
 from app.services.optimization_engine import calculate_optimization_path
-from app.models.schemas import OptimizationRequest, OptimizationResult, MultiLoanOptimizationRequest, MultiLoanOptimizationResult
+from app.models.schemas import OptimizationRequest, OptimizationResult, MultiLoanOptimizationRequest, MultiLoanOptimizationResult, LifeEventSimulationRequest, FinancialGoal, MarketAssumptions
 from app.services import plaid_service
 from app.services import investment_planner
 from app.services import multi_loan_optimizer
+from app.services import life_event_simulator
+from app.services import recommendation_surface
+from app.services import financial_snapshot
+from app.services import holdings_rebalancer
+from app.services import performance_engine
+from app.services import tax_lot_engine
+from app.services import risk_analytics
+from app.services import etf_look_through
+from app.services import market_data_prewarmer
 from app.middleware.auth import verify_user_token
 from app.services.user_service import save_financial_plan, get_user_plans, delete_plan
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Precompute the /api/optimize surface in the background; requests simulate until it's ready
+    recommendation_surface.start_background_build()
+    # Keep the ETF universe's market data warm so requests never hit a cold cache
+    prewarm_task = market_data_prewarmer.start_scheduler()
+    yield
+    if prewarm_task is not None:
+        prewarm_task.cancel()
+
+
 app = FastAPI(
     title="StackSmart API",
     description="API for optimizing financial decisions: debt repayment vs investing",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 import os
@@ -73,8 +97,20 @@ async def optimize_financial_path(request: OptimizationRequest):
     2. Investing spare cash in the market
 
     Returns the recommendation with projected net worth for both paths.
+    With include_monthly_breakdown=False, answers come from the precomputed
+    surface when the inputs are inside its grid.
     """
     try:
+        if not request.include_monthly_breakdown:
+            result = recommendation_surface.lookup_optimization(
+                loan_data=request.loan,
+                market_assumptions=request.market_assumptions,
+                monthly_budget=request.monthly_budget,
+                months_until_graduation=request.months_until_graduation
+            )
+            if result is not None:
+                return result
+
         result = calculate_optimization_path(
             loan_data=request.loan,
             market_assumptions=request.market_assumptions,
@@ -126,6 +162,34 @@ async def optimize_multi_loan(request: MultiLoanOptimizationRequest):
         raise HTTPException(status_code=500, detail="An internal error occurred.")
 
 
+@app.post("/api/simulate/life-events")
+async def simulate_life_events(request: LifeEventSimulationRequest):
+    """
+    Simulate debts and investments across a timeline of life events.
+
+    Events (graduation, first salary, raises, new loans, windfalls) change
+    payments and savings; freed-up loan payments roll to the next debt or
+    into investing.
+
+    Returns:
+    - Monthly net worth, total debt and investment curves
+    - Net worth at each event
+    - Payoff month for every loan and the debt-free month
+    """
+    try:
+        print(f"[DEBUG] Life event simulation: {len(request.loans)} loans, {len(request.events)} events, {request.months} months")
+        result = life_event_simulator.simulate_life_events(request)
+        print(f"[DEBUG] Simulated {result['segments_simulated']} segments, final net worth ${result['final_net_worth']:,.0f}")
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid input: {str(e)}")
+    except Exception as e:
+        print(f"[ERROR] Life event simulation failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail="An internal error occurred.")
+
+
 # ============= Plaid Integration Endpoints =============
 
 class CreateLinkTokenRequest(BaseModel):
@@ -268,7 +332,7 @@ async def get_investment_transactions(request: GetInvestmentDataRequest):
 
 
 @app.post("/api/investments/analyze")
-async def analyze_investments(request: GetInvestmentDataRequest):
+def analyze_investments(request: GetInvestmentDataRequest):
     """
     Comprehensive investment analysis with personalized recommendations.
 
@@ -296,6 +360,7 @@ async def analyze_investments(request: GetInvestmentDataRequest):
 
         # Analyze investment behavior
         analysis = plaid_service.analyze_investment_behavior(holdings, transactions)
+        analysis['risk_metrics'] = risk_analytics.calculate_holdings_risk(holdings['holdings'])
 
         # Combine all data
         result = {
@@ -318,6 +383,185 @@ async def analyze_investments(request: GetInvestmentDataRequest):
         raise HTTPException(status_code=500, detail="An internal error occurred.")
 
 
+@app.post("/api/investments/performance")
+async def get_investment_performance(request: GetInvestmentDataRequest):
+    """
+    Actual investment performance per account and for the whole portfolio.
+
+    Returns:
+    - Time-weighted return (cumulative and annualized)
+    - Money-weighted return (XIRR) including the timing of deposits
+    - Start value, current value and net contributions for the window
+    """
+    try:
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=request.days_back)
+
+        holdings = plaid_service.get_investment_holdings(request.access_token)
+        transactions = plaid_service.get_investment_transactions(
+            request.access_token,
+            start_date,
+            end_date
+        )
+
+        result = performance_engine.calculate_performance(holdings, transactions, start_date, end_date)
+        print(f"[DEBUG] Performance: {len(result['accounts'])} accounts, {result['transactions_analyzed']} transactions")
+        return result
+    except Exception as e:
+        print(f"[ERROR] Performance calculation failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail="An internal error occurred.")
+
+
+class TaxLotRequest(BaseModel):
+    access_token: str
+    days_back: int = Field(default=730, gt=0, le=730)  # Plaid keeps 24 months of investment transactions
+    method: str = "fifo"  # or "specific_id" (highest cost lots first)
+    min_harvest_loss: float = Field(default=100.0, ge=0)
+
+
+@app.post("/api/investments/tax-lots")
+async def get_tax_lots(request: TaxLotRequest):
+    """
+    Rebuild tax lots from transaction history and scan for tax-loss harvesting.
+
+    Returns:
+    - Lot-level cost basis per position (vs Plaid's aggregate cost basis)
+    - Realized gain/loss per sale, with wash-sale flags
+    - Open lots with harvestable losses, flagging recent purchases that
+      would make a sale today a wash sale
+    """
+    try:
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=request.days_back)
+
+        holdings = plaid_service.get_investment_holdings(request.access_token)
+        transactions = plaid_service.get_investment_transactions(
+            request.access_token,
+            start_date,
+            end_date
+        )
+
+        result = tax_lot_engine.scan_tax_lots(
+            holdings,
+            transactions,
+            end_date,
+            method=request.method,
+            min_harvest_loss=request.min_harvest_loss
+        )
+        print(f"[DEBUG] Tax lots: {result['lots_count']} lots, {len(result['harvest_opportunities'])} harvest opportunities")
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid input: {str(e)}")
+    except Exception as e:
+        print(f"[ERROR] Tax lot scan failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail="An internal error occurred.")
+
+
+class RebalanceHoldingsRequest(BaseModel):
+    access_token: str
+    target_allocation: Optional[Dict[str, float]] = None  # ticker -> percent; overrides plan_source
+    plan_source: str = "personalized_planner"  # or "investment_planner"
+    risk_tolerance: int = Field(default=7, ge=1, le=10)
+    financial_goal: FinancialGoal = FinancialGoal.WEALTH_BUILDING
+    new_contribution: float = Field(default=0.0, ge=0)
+    contributions_only: bool = False  # Only buy with new money and idle cash
+    drift_threshold: float = Field(default=5.0, gt=0, le=100)  # Percentage points
+    min_trade_amount: float = Field(default=1.0, ge=0)
+
+
+@app.post("/api/investments/rebalance")
+def rebalance_holdings(request: RebalanceHoldingsRequest):
+    """
+    Compare linked holdings to a target allocation and list the trades to fix drift.
+
+    Holdings from every account are combined by ticker. The target comes from
+    target_allocation or from personalized_planner / investment_planner.
+
+    Returns:
+    - Current vs target percent and drift per ticker
+    - Buy/sell trades (buys only with contributions_only)
+    - Whether drift exceeds the threshold
+    """
+    try:
+        holdings = plaid_service.get_investment_holdings(request.access_token)
+
+        target = request.target_allocation or holdings_rebalancer.get_target_allocation(
+            request.plan_source,
+            request.risk_tolerance,
+            request.financial_goal
+        )
+
+        result = holdings_rebalancer.calculate_rebalancing(
+            holdings['holdings'],
+            target,
+            new_contribution=request.new_contribution,
+            contributions_only=request.contributions_only,
+            drift_threshold=request.drift_threshold,
+            min_trade_amount=request.min_trade_amount
+        )
+        print(f"[DEBUG] Rebalance: max drift {result['max_drift']:.1f} points, {len(result['trades'])} trades")
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid input: {str(e)}")
+    except Exception as e:
+        print(f"[ERROR] Rebalance calculation failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail="An internal error occurred.")
+
+
+class LookThroughRequest(BaseModel):
+    access_token: Optional[str] = None  # Analyze linked holdings
+    allocation: Optional[Dict[str, float]] = None  # ticker -> percent; overrides access_token
+    plan_source: Optional[str] = None  # "personalized_planner" or "investment_planner"; overrides access_token
+    risk_tolerance: int = Field(default=7, ge=1, le=10)
+    financial_goal: FinancialGoal = FinancialGoal.WEALTH_BUILDING
+
+
+@app.post("/api/investments/look-through")
+def look_through_investments(request: LookThroughRequest):
+    """
+    Look inside ETFs to see what a portfolio actually owns.
+
+    Analyzes an explicit allocation, a planner allocation (plan_source) or the
+    linked Plaid holdings (access_token), in that order of preference.
+
+    Returns:
+    - Pairwise overlap between positions (e.g. VOO vs VTI)
+    - Largest underlying companies and which positions hold them
+    - Effective number of holdings and sector exposure
+    """
+    try:
+        if request.allocation:
+            result = etf_look_through.analyze_look_through(request.allocation)
+        elif request.plan_source:
+            allocation = holdings_rebalancer.get_target_allocation(
+                request.plan_source,
+                request.risk_tolerance,
+                request.financial_goal
+            )
+            result = etf_look_through.analyze_look_through(allocation)
+        elif request.access_token:
+            holdings = plaid_service.get_investment_holdings(request.access_token)
+            result = etf_look_through.analyze_holdings_look_through(holdings['holdings'])
+        else:
+            raise ValueError("Provide allocation, plan_source or access_token")
+
+        print(f"[DEBUG] Look-through: {len(result['positions'])} positions, {len(result['overlap'])} overlapping pairs")
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid input: {str(e)}")
+    except Exception as e:
+        print(f"[ERROR] Look-through analysis failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail="An internal error occurred.")
+
+
 # ============= Investment Planning Endpoints =============
 
 class CreateInvestmentPlanRequest(BaseModel):
@@ -327,7 +571,7 @@ class CreateInvestmentPlanRequest(BaseModel):
 
 
 @app.post("/api/investments/create-plan")
-async def create_investment_plan(request: CreateInvestmentPlanRequest):
+def create_investment_plan(request: CreateInvestmentPlanRequest):
     """
     Generate a personalized investment plan based on portfolio value and risk tolerance.
 
@@ -383,6 +627,8 @@ async def get_complete_financial_picture(request: GetBalanceRequest):
     try:
         print(f"[DEBUG] Fetching complete financial picture...")
         result = plaid_service.get_complete_financial_picture(request.access_token)
+        # Snapshot lets what-if endpoints recompute without calling Plaid again
+        result['snapshot_id'] = financial_snapshot.save_snapshot(result)
         print("[INFO] Complete financial picture fetched")
         return result
     except Exception as e:
@@ -399,6 +645,7 @@ from app.services import action_planner
 class GenerateActionPlanRequest(BaseModel):
     access_token: str
     risk_tolerance: int = 7  # 1-10
+    compare_risk_tolerances: List[int] = []  # Extra 1-10 values to project alongside
 
 
 @app.post("/api/dashboard/action-plan")
@@ -415,15 +662,29 @@ async def generate_action_plan(request: GenerateActionPlanRequest):
     - Debt interest rates vs expected returns
     - Emergency fund status
     - Risk tolerance
+
+    Set compare_risk_tolerances to also get net worth projections for other
+    risk levels (projected together in one batch).
     """
     try:
         print(f"[DEBUG] Generating action plan with risk tolerance {request.risk_tolerance}...")
 
         # Get complete financial picture
         financial_data = plaid_service.get_complete_financial_picture(request.access_token)
-
-        # Generate action plan
-        plan = action_planner.generate_action_plan(financial_data, request.risk_tolerance)
+        snapshot_id = financial_snapshot.save_snapshot(financial_data)
+
+        # Generate action plan (plus any comparison plans in the same batch)
+        risk_tolerances = [request.risk_tolerance] + [
+            rt for rt in request.compare_risk_tolerances if rt != request.risk_tolerance
+        ]
+        plans = action_planner.generate_action_plans(financial_data, risk_tolerances)
+        plan = plans[0]
+        if len(plans) > 1:
+            plan['risk_comparison'] = [
+                {'risk_tolerance': rt, 'projections': p['projections']}
+                for rt, p in zip(risk_tolerances, plans)
+            ]
+        plan['snapshot_id'] = snapshot_id
 
         print(f"[DEBUG] Action plan generated - {plan['summary']['total_actions']} actions")
         return plan
@@ -434,9 +695,67 @@ async def generate_action_plan(request: GenerateActionPlanRequest):
         raise HTTPException(status_code=500, detail="An internal error occurred.")
 
 
+class HypotheticalPayment(BaseModel):
+    type: str  # "credit_card" or "student_loan"
+    account: str  # Card name or loan name, as in the financial picture
+    amount: float = Field(..., gt=0)
+
+class ActionPlanVariant(BaseModel):
+    risk_tolerance: int = Field(default=7, ge=1, le=10)
+    emergency_fund_target: float = Field(default=3000, ge=0)
+    hypothetical_payments: List[HypotheticalPayment] = []
+
+class WhatIfActionPlanRequest(BaseModel):
+    snapshot_id: Optional[str] = None  # From complete-picture or action-plan
+    financial_data: Optional[dict] = None  # Or the picture itself
+    variants: List[ActionPlanVariant] = Field(..., min_length=1, max_length=50)
+
+
+@app.post("/api/dashboard/action-plan/what-if")
+async def generate_what_if_action_plans(request: WhatIfActionPlanRequest):
+    """
+    Recompute the action plan for many what-if variants without calling Plaid.
+
+    Uses a snapshot saved by /api/dashboard/complete-picture or
+    /api/dashboard/action-plan (or a financial picture passed directly).
+    Each variant can override risk tolerance, emergency fund target and
+    add hypothetical debt payments. Projections for all variants run in
+    one batch.
+    """
+    if request.snapshot_id is not None:
+        financial_data = financial_snapshot.get_snapshot(request.snapshot_id)
+        if financial_data is None:
+            raise HTTPException(status_code=404, detail="Snapshot not found or expired - fetch the financial picture again")
+    elif request.financial_data is not None:
+        financial_data = request.financial_data
+    else:
+        raise HTTPException(status_code=400, detail="Provide snapshot_id or financial_data")
+
+    try:
+        print(f"[DEBUG] Generating {len(request.variants)} what-if action plans...")
+        plans = action_planner.generate_action_plan_variants(
+            financial_data,
+            [variant.model_dump() for variant in request.variants]
+        )
+        return {
+            'snapshot_id': request.snapshot_id,
+            'plans': [
+                {'variant': variant.model_dump(), **plan}
+                for variant, plan in zip(request.variants, plans)
+            ]
+        }
+    except (KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid financial data: {str(e)}")
+    except Exception as e:
+        print(f"[ERROR] What-if action plans failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail="An internal error occurred.")
+
+
 # ============= Market Data Endpoints =============
 
-from app.services import market_data_service, market_data_fetcher, personalized_planner
+from app.services import market_data_service, market_data_fetcher, personalized_planner, portfolio_optimizer, rebalancing_simulator, goal_allocator
 
 class GetMarketDataRequest(BaseModel):
     ticker: str
@@ -446,7 +765,7 @@ class GetMultipleMarketDataRequest(BaseModel):
 
 
 @app.post("/api/market/quote")
-async def get_stock_quote(request: GetMarketDataRequest):
+def get_stock_quote(request: GetMarketDataRequest):
     """
     Get current stock/ETF price and daily change.
 
@@ -461,7 +780,7 @@ async def get_stock_quote(request: GetMarketDataRequest):
 
 
 @app.post("/api/market/etf-details")
-async def get_etf_details(request: GetMarketDataRequest):
+def get_etf_details(request: GetMarketDataRequest):
     """
     Get comprehensive ETF data: price, returns, dividend yield, expense ratio.
 
@@ -478,7 +797,7 @@ async def get_etf_details(request: GetMarketDataRequest):
 
 
 @app.post("/api/market/batch-etf-data")
-async def get_multiple_etf_data(request: GetMultipleMarketDataRequest):
+def get_multiple_etf_data(request: GetMultipleMarketDataRequest):
     """
     Batch fetch market data for multiple ETFs.
 
@@ -497,7 +816,7 @@ async def get_multiple_etf_data(request: GetMultipleMarketDataRequest):
 
 
 @app.get("/api/market/voo-live")
-async def get_voo_live_data():
+def get_voo_live_data():
     """
     Get live VOO (S&P 500 ETF) market data.
 
@@ -525,7 +844,7 @@ async def get_voo_live_data():
 
 
 @app.get("/api/market/sp500-performance")
-async def get_sp500_performance():
+def get_sp500_performance():
     """
     Get S&P 500 index performance data.
 
@@ -547,7 +866,7 @@ async def get_sp500_performance():
 
 
 @app.get("/api/market/etf/{ticker}")
-async def get_etf_data(ticker: str):
+def get_etf_data(ticker: str):
     """
     Get detailed market data for a specific ETF.
 
@@ -569,13 +888,56 @@ async def get_etf_data(ticker: str):
         raise HTTPException(status_code=500, detail="An internal error occurred.")
 
 
+class ETFAnalyticsRequest(BaseModel):
+    tickers: List[str] = Field(min_length=1)
+    market_assumptions: MarketAssumptions = Field(default_factory=MarketAssumptions)
+
+
+@app.post("/api/market/etf-analytics")
+def get_etf_analytics(request: ETFAnalyticsRequest):
+    """
+    Risk analytics for a set of ETFs from stored price history.
+
+    Never calls the market data provider: tickers without stored history
+    (anything outside the prewarmed ETF universe that no other request has
+    loaded) come back in unavailable_tickers.
+
+    Returns:
+    - Annual return, volatility (full year and last month) and max drawdown
+    - Sharpe ratio using market_assumptions.risk_free_rate
+    - Pairwise correlation matrix
+
+    Recomputed only when market data refreshes.
+    """
+    try:
+        result = risk_analytics.calculate_etf_analytics(
+            request.tickers,
+            request.market_assumptions.risk_free_rate
+        )
+        print(f"[DEBUG] ETF analytics for {len(request.tickers)} tickers")
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid input: {str(e)}")
+    except Exception as e:
+        print(f"[ERROR] ETF analytics failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail="An internal error occurred.")
+
+
 # ============= Personalized Financial Plan Endpoints =============
 
-from app.models.schemas import PersonalizedPlanRequest, PersonalizedPlanResult
+from app.models.schemas import (
+    PersonalizedPlanRequest,
+    PersonalizedPlanResult,
+    RebalancingSimulationRequest,
+    MultiGoalPlanRequest,
+    MultiGoalPlanResult
+)
 
 
 @app.post("/api/plan/generate", response_model=PersonalizedPlanResult)
-async def generate_financial_plan(request: PersonalizedPlanRequest):
+def generate_financial_plan(request: PersonalizedPlanRequest):
     """
     Generate a personalized investment plan based on user's profile.
 
@@ -610,6 +972,89 @@ async def generate_financial_plan(request: PersonalizedPlanRequest):
         raise HTTPException(status_code=500, detail="An internal error occurred.")
 
 
+@app.get("/api/plan/efficient-frontier")
+def get_efficient_frontier():
+    """
+    Get the mean-variance efficient frontier over the planner's ETF universe.
+
+    Each point includes:
+    - Risk score (1-10) and matching risk tolerance
+    - Expected annual return and volatility (%)
+    - ETF weights (%)
+
+    Rebuilt only when market data refreshes.
+    """
+    try:
+        print("[DEBUG] Fetching efficient frontier...")
+        return portfolio_optimizer.describe_frontier(personalized_planner.PLANNER_UNIVERSE)
+    except Exception as e:
+        print(f"[ERROR] Efficient frontier failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail="An internal error occurred.")
+
+
+@app.post("/api/plan/rebalancing-simulation")
+def simulate_rebalancing(request: RebalancingSimulationRequest):
+    """
+    Simulate a template allocation under different rebalancing schedules.
+
+    Compares never rebalancing against calendar schedules (including the template's
+    declared frequency) and threshold rebalancing, net of trading costs.
+
+    Returns per-schedule:
+    - Annualized return and volatility
+    - Median and 5th percentile ending value
+    - Rebalances per year and trading costs
+    - Difference vs never rebalancing
+    """
+    try:
+        template = personalized_planner.PORTFOLIO_TEMPLATES[request.risk_tolerance]
+        allocation = personalized_planner.get_template_allocation(request.risk_tolerance, request.financial_goal)
+        schedules = rebalancing_simulator.build_schedules(template["rebalance"], request.drift_threshold)
+
+        print(f"[DEBUG] Simulating {len(schedules)} rebalancing schedules x {request.num_paths} paths...")
+        result = rebalancing_simulator.simulate_rebalancing(
+            allocation,
+            schedules,
+            years=request.years,
+            num_paths=request.num_paths,
+            trading_cost_bps=request.trading_cost_bps,
+            initial_value=request.initial_value
+        )
+        result["declared_frequency"] = template["rebalance"]
+        return result
+    except Exception as e:
+        print(f"[ERROR] Rebalancing simulation failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail="An internal error occurred.")
+
+
+@app.post("/api/plan/multi-goal", response_model=MultiGoalPlanResult)
+def generate_multi_goal_plan(request: MultiGoalPlanRequest):
+    """
+    Split a monthly budget across several goals with targets and deadlines.
+
+    Maximizes the probability of meeting every goal across simulated market paths.
+
+    Returns:
+    - Monthly amount and share for each goal
+    - Success probability per goal and for all goals together
+    - Comparison with an even split
+    """
+    try:
+        print(f"[DEBUG] Allocating ${request.monthly_investment_amount}/mo across {len(request.goals)} goals...")
+        result = goal_allocator.allocate_budget_across_goals(request)
+        print(f"[DEBUG] Multi-goal plan: {result.probability_all_goals_met * 100:.0f}% chance all goals met")
+        return result
+    except Exception as e:
+        print(f"[ERROR] Multi-goal plan failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail="An internal error occurred.")
+
+
 # ============= User-Scoped Data Endpoints =============
 
 @app.post("/api/plans/save")
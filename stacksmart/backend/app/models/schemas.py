@@ -48,7 +48,7 @@ class OptimizationResult(BaseModel):
     recommendation: str  # 'pay_debt' or 'invest'
     net_worth_debt_path: float
     net_worth_invest_path: float
-    monthly_breakdown: List[MonthlyBreakdown]
+    monthly_breakdown: List[MonthlyBreakdown] = Field(default_factory=list)
     crossover_month: Optional[int] = None
     confidence_score: float
     investment_allocations: Optional[List[InvestmentAllocation]] = None
@@ -60,6 +60,7 @@ class OptimizationRequest(BaseModel):
     monthly_budget: float = Field(..., gt=0, description="Monthly spare cash available")
     months_until_graduation: int = Field(default=48, gt=0, le=120, description="Months until graduation")
     market_assumptions: MarketAssumptions = Field(default_factory=MarketAssumptions)
+    include_monthly_breakdown: bool = Field(default=True, description="Set False for a fast answer from the precomputed surface")
 
 
 # ============= Multi-Loan Models =============
@@ -130,6 +131,10 @@ class PersonalizedPlanRequest(BaseModel):
     include_roth_ira: bool = Field(default=False, description="Allocate to Roth IRA before brokerage")
     current_emergency_fund: float = Field(default=0.0, ge=0, description="Current emergency fund balance")
     emergency_fund_months_target: int = Field(default=3, ge=1, le=12, description="Target months of expenses in emergency fund")
+    use_efficient_frontier: bool = Field(default=False, description="Use the mean-variance efficient frontier instead of the fixed template allocation")
+    use_glide_path: bool = Field(default=False, description="Shift the allocation toward bonds each year as the time horizon approaches")
+    retirement_tax_rate: float = Field(default=0.15, ge=0, le=0.6, description="Expected income tax rate on 401k withdrawals")
+    capital_gains_tax_rate: float = Field(default=0.15, ge=0, le=0.5, description="Tax rate on dividends and capital gains in the brokerage account")
 
 class PersonalizedPlanResult(BaseModel):
     portfolio_name: str
@@ -149,3 +154,83 @@ class PersonalizedPlanResult(BaseModel):
     warnings: Optional[List[str]] = None
     paycheck_breakdown: Optional[dict] = None
     months_to_emergency_fund: Optional[int] = None
+    glide_path: Optional[dict] = None
+    account_projections: Optional[dict] = None
+
+
+# ============= Rebalancing Simulation Models =============
+
+class RebalancingSimulationRequest(BaseModel):
+    risk_tolerance: RiskTolerance = Field(default=RiskTolerance.MODERATE, description="Template to simulate")
+    financial_goal: FinancialGoal = Field(default=FinancialGoal.WEALTH_BUILDING, description="Goal adjustments applied to the template")
+    years: int = Field(default=10, gt=0, le=40, description="Simulation length in years")
+    num_paths: int = Field(default=1000, ge=100, le=10000, description="Number of simulated market paths")
+    trading_cost_bps: float = Field(default=5.0, ge=0, le=100, description="Trading cost per dollar traded, in basis points")
+    drift_threshold: float = Field(default=0.05, gt=0, le=0.5, description="Drift band for threshold rebalancing (e.g., 0.05 = 5 points)")
+    initial_value: float = Field(default=10000.0, gt=0, description="Starting portfolio value")
+
+
+# ============= Multi-Goal Plan Models =============
+
+class GoalTarget(BaseModel):
+    name: str = Field(..., description="Goal name (e.g., 'Emergency fund', 'House down payment')")
+    goal_type: FinancialGoal = Field(default=FinancialGoal.WEALTH_BUILDING, description="Goal category (drives portfolio adjustments)")
+    target_amount: float = Field(..., gt=0, description="Amount needed by the deadline")
+    deadline_months: int = Field(..., gt=0, le=480, description="Months until the money is needed")
+    current_amount: float = Field(default=0.0, ge=0, description="Amount already saved toward this goal")
+    risk_tolerance: Optional[RiskTolerance] = Field(default=None, description="Portfolio for this goal (defaults by deadline)")
+    guaranteed_rate: Optional[float] = Field(default=None, ge=0, le=1, description="Fixed annual return instead of the market, e.g. savings APY or debt APR being paid down")
+
+class MultiGoalPlanRequest(BaseModel):
+    monthly_investment_amount: float = Field(..., gt=0, description="Total monthly budget to split across goals")
+    goals: List[GoalTarget] = Field(..., min_length=1, max_length=6, description="Goals to fund")
+    num_paths: int = Field(default=2000, ge=200, le=5000, description="Number of simulated market paths")
+
+class GoalAllocation(BaseModel):
+    name: str
+    goal_type: str
+    target_amount: float
+    deadline_months: int
+    risk_tolerance: str
+    expected_annual_return: float
+    share_percentage: float
+    monthly_amount: float
+    success_probability: float
+    median_value_at_deadline: float
+
+class MultiGoalPlanResult(BaseModel):
+    allocations: List[GoalAllocation]
+    probability_all_goals_met: float
+    expected_goals_met: float
+    equal_split_probability: float
+    candidates_evaluated: int
+    reasoning: List[str]
+
+
+# ============= Life Event Simulation Models =============
+
+class LifeEventType(str, Enum):
+    GRADUATION = "graduation"  # Student loan deferment ends
+    FIRST_SALARY = "first_salary"  # Monthly savings set to amount
+    RAISE = "raise"  # Monthly savings increase by amount
+    SAVINGS_CHANGE = "savings_change"  # Monthly savings set to amount (e.g., new rent)
+    NEW_LOAN = "new_loan"  # Take on a new loan (e.g., car loan)
+    DEFERMENT_END = "deferment_end"  # Deferment ends for the named loan (or all deferred loans)
+    WINDFALL = "windfall"  # One-time cash (bonus, gift); negative for a one-time expense
+
+class LifeEvent(BaseModel):
+    month: int = Field(..., ge=0, le=600, description="Month the event happens (0 = now)")
+    event_type: LifeEventType
+    amount: Optional[float] = Field(default=None, description="Dollar amount for salary, raise, savings change or windfall")
+    loan: Optional[LoanData] = Field(default=None, description="Loan taken on for new_loan events")
+    loan_name: Optional[str] = Field(default=None, description="Loan affected by deferment_end (all deferred loans if omitted)")
+    description: Optional[str] = None
+
+class LifeEventSimulationRequest(BaseModel):
+    loans: List[LoanData] = Field(default_factory=list, description="Current loans")
+    current_savings: float = Field(default=0.0, ge=0, description="Current invested balance")
+    monthly_savings: float = Field(default=0.0, ge=0, description="Monthly cash available for debt payments and investing today")
+    months_until_graduation: Optional[int] = Field(default=None, ge=0, le=120, description="Student loans are deferred until graduation")
+    events: List[LifeEvent] = Field(default_factory=list, description="Timeline of future events")
+    months: int = Field(default=120, gt=0, le=600, description="Simulation length in months")
+    market_assumptions: MarketAssumptions = Field(default_factory=MarketAssumptions)
@@ -0,0 +1,109 @@
+"""
+Tax-Aware Account Projections
+
+Projects every account from the paycheck allocation with its own tax treatment:
+- 401k (employee + employer match): grows tax-deferred, taxed as income on withdrawal
+- Roth IRA: grows and withdraws tax-free
+- Taxable brokerage: dividends taxed every year (dividend drag), gains taxed on sale
+
+All accounts are evaluated together as an (accounts x months) array using the
+closed-form future value, so a 30-year projection is a handful of array operations.
+"""
+
+from typing import Dict, List
+import numpy as np
+from app.services import market_data_service
+
+PROJECTION_HORIZONS = [1, 5, 10, 20, 30]  # Years, matching PersonalizedPlanResult
+
+DEFAULT_RETIREMENT_TAX_RATE = 0.15  # Effective income tax rate on 401k withdrawals
+DEFAULT_CAPITAL_GAINS_TAX_RATE = 0.15  # Long-term capital gains / qualified dividends
+
+
+def portfolio_dividend_yield(allocation: Dict[str, float]) -> float:
+    """Weighted dividend yield (decimal) of an allocation in percent"""
+    total = sum(pct for pct in allocation.values() if pct > 0)
+    if total <= 0:
+        return 0.0
+    weighted = sum(
+        pct * market_data_service.get_dividend_yield(ticker)
+        for ticker, pct in allocation.items()
+        if pct > 0
+    )
+    return weighted / total / 100
+
+
+def project_accounts(
+    paycheck_breakdown: Dict,
+    current_savings: float,
+    annual_return: float,
+    dividend_yield: float,
+    retirement_tax_rate: float = DEFAULT_RETIREMENT_TAX_RATE,
+    capital_gains_tax_rate: float = DEFAULT_CAPITAL_GAINS_TAX_RATE,
+    horizons: List[int] = PROJECTION_HORIZONS
+) -> Dict:
+    """
+    Project pre-tax and after-tax value of each account at each horizon.
+
+    Args:
+        paycheck_breakdown: Output of personalized_planner.calculate_paycheck_allocation
+        current_savings: Existing balance (held in the taxable brokerage account)
+        annual_return: Expected annual return as decimal (same portfolio in every account)
+        dividend_yield: Portfolio dividend yield as decimal (drives taxable drag)
+        retirement_tax_rate: Income tax rate applied to 401k withdrawals
+        capital_gains_tax_rate: Tax rate on dividends and realized gains
+        horizons: Years to report
+
+    Returns:
+        Column-oriented dict: one list per account, aligned with horizons_years
+    """
+    accounts = ["401k", "roth_ira", "brokerage"]
+    contributions = np.array([
+        paycheck_breakdown["contribution_401k"] + paycheck_breakdown["employer_match_401k"],
+        paycheck_breakdown["contribution_roth_ira"],
+        paycheck_breakdown["brokerage_investment"],
+    ])
+    starting = np.array([0.0, 0.0, current_savings])
+
+    # Tax treatment per account
+    income_tax = np.array([retirement_tax_rate, 0.0, 0.0])
+    gains_tax = np.array([0.0, 0.0, capital_gains_tax_rate])
+    dividend_tax = np.array([0.0, 0.0, capital_gains_tax_rate])
+
+    # Dividend tax is paid each year out of the dividend, lowering the reinvested growth
+    monthly_rate = (annual_return - dividend_yield * dividend_tax) / 12
+    months = np.arange(1, max(horizons) * 12 + 1)
+
+    # Closed-form FV with end-of-month contributions, for every account and month at once
+    growth = (1 + monthly_rate[:, None]) ** months[None, :]  # (accounts, months)
+    safe_rate = np.where(monthly_rate == 0, 1.0, monthly_rate)[:, None]
+    annuity = np.where(monthly_rate[:, None] == 0, months[None, :], (growth - 1) / safe_rate)
+    values = starting[:, None] * growth + contributions[:, None] * annuity
+
+    # Cost basis: deposits plus after-tax dividends reinvested along the way
+    previous = np.hstack([starting[:, None], values[:, :-1]])
+    reinvested = np.cumsum(previous * dividend_yield / 12 * (1 - dividend_tax[:, None]), axis=1)
+    basis = starting[:, None] + contributions[:, None] * months[None, :] + np.where(gains_tax[:, None] > 0, reinvested, 0.0)
+
+    after_tax = values * (1 - income_tax[:, None]) - np.maximum(0.0, values - basis) * gains_tax[:, None]
+
+    columns = np.array(horizons) * 12 - 1
+    pre_tax_at = values[:, columns]
+    after_tax_at = after_tax[:, columns]
+    contributed_at = starting[:, None] + contributions[:, None] * months[None, columns]
+
+    return {
+        "horizons_years": list(horizons),
+        "monthly_contributions": {a: round(float(c), 2) for a, c in zip(accounts, contributions)},
+        "contributed": {a: np.round(row, 2).tolist() for a, row in zip(accounts, contributed_at)},
+        "pre_tax_value": {a: np.round(row, 2).tolist() for a, row in zip(accounts, pre_tax_at)},
+        "after_tax_value": {a: np.round(row, 2).tolist() for a, row in zip(accounts, after_tax_at)},
+        "total_pre_tax": np.round(pre_tax_at.sum(axis=0), 2).tolist(),
+        "total_after_tax": np.round(after_tax_at.sum(axis=0), 2).tolist(),
+        "assumptions": {
+            "annual_return": round(annual_return * 100, 2),
+            "dividend_yield": round(dividend_yield * 100, 2),
+            "retirement_tax_rate": retirement_tax_rate,
+            "capital_gains_tax_rate": capital_gains_tax_rate,
+        }
+    }
@@ -3,7 +3,11 @@ Intelligent Action Plan Engine
 Analyzes complete financial picture and tells user exactly what to do with their money
 """
 
-from typing import Dict, List
+import copy
+from typing import Dict, List, Tuple
+from app.services import net_worth_projector
+
+DEFAULT_EMERGENCY_FUND_TARGET = 3000  # Minimum for college students
 
 
 def generate_action_plan(financial_data: Dict, risk_tolerance: int = 7) -> Dict:
@@ -22,6 +26,108 @@ def generate_action_plan(financial_data: Dict, risk_tolerance: int = 7) -> Dict:
     Returns:
         Detailed action plan with specific dollar amounts and reasoning
     """
+    return generate_action_plans(financial_data, [risk_tolerance])[0]
+
+
+def generate_action_plans(financial_data: Dict, risk_tolerances: List[int]) -> List[Dict]:
+    """
+    Generate one action plan per risk tolerance.
+
+    Net worth projections for all plans run in a single batched simulation.
+    """
+    return generate_action_plan_variants(financial_data, [{'risk_tolerance': rt} for rt in risk_tolerances])
+
+
+def generate_action_plan_variants(financial_data: Dict, variants: List[Dict]) -> List[Dict]:
+    """
+    Generate one action plan per what-if variant of the same financial picture.
+
+    Each variant may set:
+    - risk_tolerance: 1-10 (default 7)
+    - emergency_fund_target: cash to keep on hand (default $3,000)
+    - hypothetical_payments: [{'type', 'account', 'amount'}] paid from cash
+      before the plan is built
+
+    Net worth projections for all variants run in a single batched simulation.
+    """
+    plans = []
+    scenarios = []
+    for variant in variants:
+        risk_tolerance = variant.get('risk_tolerance', 7)
+        requested = [
+            {'action': 'pay_debt', 'type': p['type'], 'account': p['account'], 'amount': p['amount']}
+            for p in variant.get('hypothetical_payments', [])
+        ]
+        picture, payments = _apply_hypothetical_payments(financial_data, requested)
+        plan = _build_actions(picture, risk_tolerance, variant.get('emergency_fund_target', DEFAULT_EMERGENCY_FUND_TARGET))
+        if payments:
+            plan['hypothetical_payments'] = payments
+
+        plans.append(plan)
+        # Projections start from the real picture: the hypothetical payments are up-front actions
+        scenarios.append({'actions': payments + plan['actions'], 'annual_return': _expected_return(risk_tolerance) / 100})
+
+    projections = net_worth_projector.project_scenarios(financial_data, scenarios)
+
+    current_net_worth = financial_data['net_worth']
+    for plan, projection in zip(plans, projections):
+        plan['projections'] = {
+            'current_net_worth': current_net_worth,
+            'projected_1yr': projection['projected_1yr'],
+            'projected_5yr': projection['projected_5yr'],
+            'gain_1yr': projection['projected_1yr'] - current_net_worth,
+            'gain_5yr': projection['projected_5yr'] - current_net_worth,
+            'remaining_debt_5yr': projection['remaining_debt_5yr'],
+            'monthly_net_worth': projection['monthly_net_worth']
+        }
+
+    return plans
+
+
+def _apply_hypothetical_payments(financial_data: Dict, payments: List[Dict]) -> Tuple[Dict, List[Dict]]:
+    """
+    Financial picture after paying the given debts from cash (original is not modified).
+
+    Each payment is capped at the debt's remaining balance; payments to unknown
+    or already paid-off accounts are dropped.
+
+    Returns:
+        (picture, payments as actually applied)
+    """
+    if not payments:
+        return financial_data, []
+
+    picture = copy.deepcopy(financial_data)
+    applied = []
+    liabilities = picture.get('liabilities', {})
+    for payment in payments:
+        if payment['type'] == 'credit_card':
+            debts, name_key = liabilities.get('credit_cards', []), 'name'
+        else:
+            debts, name_key = liabilities.get('student_loans', []), 'loan_name'
+
+        for debt in debts:
+            if debt.get(name_key, 'Student Loan') == payment['account'] and debt['balance'] > 0:
+                paid = min(payment['amount'], debt['balance'])
+                debt['balance'] -= paid
+                picture['bank_accounts']['total_balance'] -= paid
+                applied.append({**payment, 'amount': paid})
+                break
+
+    return picture, applied
+
+
+def _expected_return(risk_tolerance: int) -> float:
+    """Expected annual market return (%) for a 1-10 risk tolerance"""
+    if risk_tolerance >= 7:
+        return 10.0  # Aggressive portfolio
+    elif risk_tolerance >= 4:
+        return 7.5   # Moderate portfolio
+    return 5.5       # Conservative portfolio
+
+
+def _build_actions(financial_data: Dict, risk_tolerance: int, emergency_fund_target: float = DEFAULT_EMERGENCY_FUND_TARGET) -> Dict:
+    """Prioritized actions, reasoning and summary for one risk tolerance"""
 
     actions = []
     reasoning = []
@@ -36,7 +142,6 @@ def generate_action_plan(financial_data: Dict, risk_tolerance: int = 7) -> Dict:
     credit_cards = liabilities.get('credit_cards', [])
 
     # Calculate spare cash (keep 3-6 months emergency fund)
-    emergency_fund_target = 3000  # Minimum for college students
     spare_cash = max(0, available_cash - emergency_fund_target)
 
     # Priority 1: Pay off high-interest credit cards (APR > 15%)
@@ -65,7 +170,7 @@ def generate_action_plan(financial_data: Dict, risk_tolerance: int = 7) -> Dict:
             'amount': needed,
             'reason': "Financial safety net - prevents going into debt for emergencies"
         })
-        reasoning.append(f"Build ${emergency_fund_target} emergency fund before aggressive investing.")
+        reasoning.append(f"Build ${emergency_fund_target:.0f} emergency fund before aggressive investing.")
 
     # Priority 3: Student loans vs investing decision
     if student_loans and spare_cash > 0:
@@ -74,12 +179,7 @@ def generate_action_plan(financial_data: Dict, risk_tolerance: int = 7) -> Dict:
         loan_rate = highest_rate_loan['interest_rate']
 
         # Expected market return based on risk tolerance
-        if risk_tolerance >= 7:
-            expected_return = 10.0  # Aggressive portfolio
-        elif risk_tolerance >= 4:
-            expected_return = 7.5   # Moderate portfolio
-        else:
-            expected_return = 5.5   # Conservative portfolio
+        expected_return = _expected_return(risk_tolerance)
 
         # Decision logic
         if loan_rate > expected_return + 2:  # Pay off debt if rate is 2%+ higher
@@ -132,11 +232,6 @@ def generate_action_plan(financial_data: Dict, risk_tolerance: int = 7) -> Dict:
         })
         reasoning.append("Roth IRA: Your money grows TAX-FREE. A $7,500 investment at age 20 becomes $330,000+ by retirement!")
 
-    # Calculate net worth trajectory
-    current_net_worth = financial_data['net_worth']
-    projected_net_worth_1yr = _project_net_worth(financial_data, actions, 1)
-    projected_net_worth_5yr = _project_net_worth(financial_data, actions, 5)
-
     return {
         'actions': sorted(actions, key=lambda x: x['priority']),
         'reasoning': reasoning,
@@ -145,13 +240,6 @@ def generate_action_plan(financial_data: Dict, risk_tolerance: int = 7) -> Dict:
             'emergency_fund_status': 'good' if available_cash >= emergency_fund_target else 'needs_attention',
             'debt_payoff_recommended': any(a['action'] == 'pay_debt' for a in actions),
             'investment_recommended': any(a['action'] == 'invest' for a in actions)
-        },
-        'projections': {
-            'current_net_worth': current_net_worth,
-            'projected_1yr': projected_net_worth_1yr,
-            'projected_5yr': projected_net_worth_5yr,
-            'gain_1yr': projected_net_worth_1yr - current_net_worth,
-            'gain_5yr': projected_net_worth_5yr - current_net_worth
         }
     }
 
@@ -183,22 +271,3 @@ def _get_investment_allocation(amount: float, risk_tolerance: int) -> List[Dict]
         ]
 
     return allocations
-
-
-def _project_net_worth(financial_data: Dict, actions: List[Dict], years: int) -> float:
-    """Project net worth based on action plan"""
-    current_net_worth = financial_data['net_worth']
-
-    # Simplified projection - in production would use more sophisticated modeling
-    total_invested = sum(a['amount'] for a in actions if a['action'] == 'invest')
-    total_debt_paid = sum(a['amount'] for a in actions if a['action'] == 'pay_debt')
-
-    # Assume 8% annual return on investments
-    investment_growth = total_invested * ((1.08 ** years) - 1)
-
-    # Assume debt would have grown at average 6% if not paid
-    debt_savings = total_debt_paid * ((1.06 ** years) - 1)
-
-    projected = current_net_worth + investment_growth + debt_savings
-
-    return projected
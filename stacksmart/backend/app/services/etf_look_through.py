@@ -0,0 +1,240 @@
+"""
+ETF Look-Through Analysis
+
+Looks inside the user's funds to show what they actually own. Holding VOO and
+QQQ, or VTI and VOO, looks diversified by ticker count but largely buys the
+same companies twice.
+
+Fund constituents come from app/data/etf_constituents.json (top disclosed
+holdings and sector weights per fund) and are loaded once into a sparse
+fund x security matrix in CSR form. A portfolio's look-through exposure is one
+sparse product of its position weights with that matrix; stocks held directly
+are rows with a single constituent (themselves).
+
+Only disclosed holdings are attributed. The rest of each fund is treated as
+spread thinly across many securities, and so are the pooled segments bond funds
+are disclosed by (Treasuries, agency MBS, ...): they count toward sector
+exposure and pooled_percent but not toward overlap, duplication, top exposures
+or concentration. Overlap is therefore a lower bound and the effective number
+of holdings an upper bound (None when nothing is known security by security).
+"""
+
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+from app.services.holdings_rebalancer import aggregate_holdings, CASH_KEY
+
+CONSTITUENTS_PATH = os.getenv(
+    "ETF_CONSTITUENTS_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "etf_constituents.json")
+)
+UNCLASSIFIED_SECTOR = "Unclassified"
+CASH_SECTOR = "Cash"
+TOP_EXPOSURES = 15
+
+_constituents: Optional[Dict] = None
+_load_lock = threading.Lock()
+
+
+def _load_constituents() -> Dict:
+    """Parse the constituent file into CSR arrays (once per process)"""
+    global _constituents
+    with _load_lock:
+        if _constituents is not None:
+            return _constituents
+
+        with open(CONSTITUENTS_PATH) as f:
+            raw = json.load(f)
+
+        funds = list(raw['funds'])
+        security_info = raw.get('securities', {})
+        securities = list(dict.fromkeys(
+            list(security_info) + [s for fund in raw['funds'].values() for s in fund['holdings']]
+        ))
+        security_index = {s: i for i, s in enumerate(securities)}
+        sectors = list(dict.fromkeys(
+            [info['sector'] for info in security_info.values()]
+            + [sector for fund in raw['funds'].values() for sector in fund['sectors']]
+            + [UNCLASSIFIED_SECTOR, CASH_SECTOR]
+        ))
+        sector_index = {s: i for i, s in enumerate(sectors)}
+
+        indptr = [0]
+        indices, data = [], []
+        fund_sectors = np.zeros((len(funds), len(sectors)))
+        for row, ticker in enumerate(funds):
+            fund = raw['funds'][ticker]
+            for symbol, percent in fund['holdings'].items():
+                indices.append(security_index[symbol])
+                data.append(percent / 100)
+            indptr.append(len(indices))
+            for sector, percent in fund['sectors'].items():
+                fund_sectors[row, sector_index[sector]] = percent / 100
+
+        _constituents = {
+            'as_of': raw.get('as_of'),
+            'funds': funds,
+            'fund_index': {t: i for i, t in enumerate(funds)},
+            'fund_names': {t: raw['funds'][t].get('name') for t in funds},
+            'securities': securities,
+            'security_index': security_index,
+            'security_names': [security_info.get(s, {}).get('name') for s in securities],
+            'security_pooled': np.array([bool(security_info.get(s, {}).get('pooled')) for s in securities]),
+            'security_sectors': np.array([
+                sector_index[security_info.get(s, {}).get('sector', UNCLASSIFIED_SECTOR)] for s in securities
+            ], dtype=int),
+            'sectors': sectors,
+            'sector_index': sector_index,
+            'indptr': np.array(indptr, dtype=int),
+            'indices': np.array(indices, dtype=int),
+            'data': np.array(data, dtype=float),
+            'fund_sectors': fund_sectors,
+        }
+        print(f"[INFO] Loaded look-through data for {len(funds)} funds, {len(securities)} securities")
+        return _constituents
+
+
+def analyze_look_through(positions: Dict[str, float]) -> Dict:
+    """
+    Look-through exposure, overlap and sector mix for a set of positions.
+
+    Args:
+        positions: ticker -> dollar value or percent (normalized here).
+            CASH is cash; tickers that aren't known funds are direct holdings.
+
+    Returns:
+        Top underlying exposures, pairwise overlap between positions,
+        effective number of holdings and sector exposure (percent of portfolio)
+    """
+    c = _load_constituents()
+    positions = {t: float(v) for t, v in positions.items() if v and v > 0}
+    total = sum(positions.values())
+    if total <= 0:
+        raise ValueError("No positions with a positive value")
+
+    tickers = list(positions)
+    weights = np.array([positions[t] for t in tickers]) / total
+    num_positions = len(tickers)
+
+    # Portfolio rows in CSR form: fund rows copied from the constituent matrix,
+    # direct holdings (and cash) as single-entry rows appended after the known securities
+    securities = list(c['securities'])
+    security_index = dict(c['security_index'])
+    sector_of = list(c['security_sectors'])
+    pooled = list(c['security_pooled'])
+    row_lengths, indices, data = [], [], []
+    is_fund = np.zeros(num_positions, dtype=bool)
+    for i, ticker in enumerate(tickers):
+        fund_row = c['fund_index'].get(ticker)
+        if fund_row is not None:
+            start, end = c['indptr'][fund_row], c['indptr'][fund_row + 1]
+            indices.append(c['indices'][start:end])
+            data.append(c['data'][start:end])
+            row_lengths.append(end - start)
+            is_fund[i] = True
+            continue
+        if ticker not in security_index:
+            security_index[ticker] = len(securities)
+            securities.append(ticker)
+            sector_of.append(c['sector_index'][CASH_SECTOR if ticker == CASH_KEY else UNCLASSIFIED_SECTOR])
+            pooled.append(False)
+        indices.append(np.array([security_index[ticker]]))
+        data.append(np.array([1.0]))
+        row_lengths.append(1)
+
+    rows = np.repeat(np.arange(num_positions), row_lengths)
+    indices = np.concatenate(indices) if indices else np.zeros(0, dtype=int)
+    data = np.concatenate(data) if data else np.zeros(0)
+    sector_of = np.array(sector_of, dtype=int)
+    pooled = np.array(pooled, dtype=bool)
+
+    # Sparse product: exposure[s] = sum_i weight[i] * W[i, s]
+    contributions = weights[rows] * data
+    exposure = np.bincount(indices, weights=contributions, minlength=len(securities))
+    pooled_exposure = float(exposure[pooled].sum())
+    attributed = float(exposure.sum()) - pooled_exposure
+
+    # Sector exposure: whole-fund sector weights for funds, the security's sector otherwise
+    fund_rows = [c['fund_index'][t] for t in tickers if t in c['fund_index']]
+    sector_exposure = weights[is_fund] @ c['fund_sectors'][fund_rows]
+    direct = ~is_fund[rows]
+    sector_exposure = sector_exposure + np.bincount(
+        sector_of[indices[direct]], weights=contributions[direct], minlength=len(c['sectors'])
+    )
+
+    # Security-level metrics below ignore pooled segments, like the undisclosed remainder
+    exposure[pooled] = 0.0
+    security_level = ~pooled[indices]
+
+    # Pairwise overlap: sum over securities of min(W[i, s], W[j, s]), on the held columns only
+    columns, local = np.unique(indices[security_level], return_inverse=True)
+    dense = np.zeros((num_positions, len(columns)))
+    dense[rows[security_level], local] = data[security_level]
+    overlap = np.minimum(dense[:, None, :], dense[None, :, :]).sum(axis=2)
+    pairs = []
+    for i, j in zip(*np.triu_indices(num_positions, k=1)):
+        if overlap[i, j] > 0:
+            shared = np.flatnonzero((dense[i] > 0) & (dense[j] > 0))
+            shared = shared[np.argsort(-np.minimum(dense[i, shared], dense[j, shared]))]
+            pairs.append({
+                'tickers': [tickers[i], tickers[j]],
+                'overlap_percent': round(float(overlap[i, j]) * 100, 2),
+                'shared_holdings': len(shared),
+                'top_shared': [securities[columns[s]] for s in shared[:5]]
+            })
+    pairs.sort(key=lambda p: -p['overlap_percent'])
+
+    # Exposure reached through more than one position
+    holders = np.bincount(indices[security_level], minlength=len(securities))
+    duplicated = float(exposure[holders > 1].sum())
+
+    # Concentration over attributed securities (undisclosed remainders and pooled segments add ~0)
+    herfindahl = float(np.sum(exposure ** 2))
+    effective_holdings = 1 / herfindahl if herfindahl > 0 else None
+
+    order = np.argsort(-exposure)[:TOP_EXPOSURES]
+    top_exposures = []
+    for s in order:
+        if exposure[s] <= 0:
+            break
+        via = rows[indices == s]
+        top_exposures.append({
+            'security': securities[s],
+            'name': c['security_names'][s] if s < len(c['security_names']) else None,
+            'percent': round(float(exposure[s]) * 100, 2),
+            'held_through': [tickers[i] for i in via]
+        })
+
+    sectors = sorted(
+        ({'sector': name, 'percent': round(float(sector_exposure[k]) * 100, 2)}
+         for k, name in enumerate(c['sectors']) if sector_exposure[k] > 0),
+        key=lambda s: -s['percent']
+    )
+
+    return {
+        'data_as_of': c['as_of'],
+        'positions': [
+            {
+                'ticker': t,
+                'percent': round(float(w) * 100, 2),
+                'look_through': bool(f),
+                'name': c['fund_names'].get(t)
+            }
+            for t, w, f in zip(tickers, weights, is_fund)
+        ],
+        'attributed_percent': round(attributed * 100, 2),
+        'pooled_percent': round(pooled_exposure * 100, 2),
+        'effective_number_of_holdings': round(effective_holdings, 1) if effective_holdings else None,
+        'duplicated_exposure_percent': round(duplicated * 100, 2),
+        'overlap': pairs,
+        'top_exposures': top_exposures,
+        'sector_exposure': sectors,
+    }
+
+
+def analyze_holdings_look_through(holdings: List[Dict]) -> Dict:
+    """Look-through analysis of Plaid holdings, combined across accounts by ticker"""
+    keys, values, _ = aggregate_holdings(holdings)
+    return analyze_look_through({str(k): float(v) for k, v in zip(keys, values)})
@@ -0,0 +1,43 @@
+"""
+Financial Picture Snapshots
+
+Keeps recently fetched Plaid financial pictures in memory under a random ID,
+so what-if endpoints (risk slider, hypothetical payments) can recompute
+without calling Plaid again.
+"""
+
+import copy
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+SNAPSHOT_TTL_MINUTES = 30
+MAX_SNAPSHOTS = 1000
+
+_snapshots: "OrderedDict[str, Tuple[Dict, datetime]]" = OrderedDict()
+_snapshot_lock = threading.Lock()
+
+
+def save_snapshot(financial_data: Dict) -> str:
+    """Store a financial picture and return its snapshot ID"""
+    snapshot_id = uuid.uuid4().hex
+    with _snapshot_lock:
+        _snapshots[snapshot_id] = (copy.deepcopy(financial_data), datetime.now())
+        while len(_snapshots) > MAX_SNAPSHOTS:
+            _snapshots.popitem(last=False)
+    return snapshot_id
+
+
+def get_snapshot(snapshot_id: str) -> Optional[Dict]:
+    """Copy of a stored financial picture, or None if unknown or expired"""
+    with _snapshot_lock:
+        entry = _snapshots.get(snapshot_id)
+        if entry is None:
+            return None
+        financial_data, created = entry
+        if datetime.now() - created >= timedelta(minutes=SNAPSHOT_TTL_MINUTES):
+            del _snapshots[snapshot_id]
+            return None
+    return copy.deepcopy(financial_data)
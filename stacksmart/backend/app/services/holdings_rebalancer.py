@@ -0,0 +1,191 @@
+"""
+Holdings Drift & Rebalancing Trades
+
+Compares linked Plaid holdings against a target allocation from
+personalized_planner or investment_planner and works out the trades to get
+back to target:
+- Full rebalance: buy underweight and sell overweight positions
+- Contributions only: no sales, new money (and idle cash) goes to the most
+  underweight positions first
+
+Holdings from every account are aggregated by ticker with array group-bys,
+so many accounts and lots are handled in one pass.
+"""
+
+from typing import Dict, List, Tuple
+import numpy as np
+from app.models.schemas import RiskTolerance, FinancialGoal
+from app.services import personalized_planner, investment_planner
+
+CASH_KEY = "CASH"
+DEFAULT_DRIFT_THRESHOLD = 5.0  # Percentage points before a rebalance is recommended
+DEFAULT_MIN_TRADE = 1.0  # Skip trades smaller than this many dollars
+
+
+def risk_tolerance_bucket(risk_tolerance: int) -> RiskTolerance:
+    """Map a 1-10 risk score to the planner's buckets (1-3, 4-6, 7-10)"""
+    if risk_tolerance <= 3:
+        return RiskTolerance.CONSERVATIVE
+    elif risk_tolerance <= 6:
+        return RiskTolerance.MODERATE
+    return RiskTolerance.AGGRESSIVE
+
+
+def get_target_allocation(
+    plan_source: str,
+    risk_tolerance: int,
+    financial_goal: FinancialGoal = FinancialGoal.WEALTH_BUILDING
+) -> Dict[str, float]:
+    """
+    Target allocation (ticker -> percent) from one of the planners' pure
+    allocation lookups (no market data is fetched).
+
+    investment_planner's high-yield savings slice lives outside the brokerage
+    account, so it is left out and the rest is renormalized.
+    """
+    if plan_source == "personalized_planner":
+        allocation = personalized_planner.get_template_allocation(risk_tolerance_bucket(risk_tolerance), financial_goal)
+    elif plan_source == "investment_planner":
+        allocation = investment_planner.get_allocation(risk_tolerance)
+        allocation.pop('HYSA', None)
+    else:
+        raise ValueError(f"Unknown plan source: {plan_source}")
+
+    allocation = {t: pct for t, pct in allocation.items() if pct > 0}
+    total = sum(allocation.values())
+    return {t: pct / total * 100 for t, pct in allocation.items()}
+
+
+def aggregate_holdings(holdings: List[Dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Total value and quantity per ticker across every account and lot.
+
+    Cash positions are grouped under CASH; securities without a ticker keep
+    their security ID.
+
+    Returns:
+        (keys, values, quantities) with one entry per unique key
+    """
+    if not holdings:
+        return np.array([], dtype=str), np.zeros(0), np.zeros(0)
+
+    keys = np.array([
+        CASH_KEY if h.get('type') == 'cash' else (h.get('ticker') or h.get('security_id') or 'UNKNOWN')
+        for h in holdings
+    ])
+    values = np.array([h.get('value') or 0.0 for h in holdings], dtype=float)
+    quantities = np.array([h.get('quantity') or 0.0 for h in holdings], dtype=float)
+
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    return (
+        unique_keys,
+        np.bincount(inverse, weights=values, minlength=len(unique_keys)),
+        np.bincount(inverse, weights=quantities, minlength=len(unique_keys))
+    )
+
+
+def _contribution_only_buys(current: np.ndarray, target_values: np.ndarray, budget: float) -> np.ndarray:
+    """
+    Split new money to bring the portfolio as close to target as possible without selling.
+
+    Minimizes the squared distance to the target values: every position with a
+    shortfall above a common level gets topped up to that level (water-filling).
+    """
+    shortfall = target_values - current
+    if budget <= 0 or not (shortfall > 0).any():
+        return np.zeros_like(current)
+
+    ordered = np.sort(shortfall)[::-1]
+    levels = (np.cumsum(ordered) - budget) / np.arange(1, len(ordered) + 1)
+    count = int(np.count_nonzero(ordered > levels))
+    level = max(0.0, levels[count - 1])
+    return np.maximum(0.0, shortfall - level)
+
+
+def calculate_rebalancing(
+    holdings: List[Dict],
+    target_allocation: Dict[str, float],
+    new_contribution: float = 0.0,
+    contributions_only: bool = False,
+    drift_threshold: float = DEFAULT_DRIFT_THRESHOLD,
+    min_trade_amount: float = DEFAULT_MIN_TRADE
+) -> Dict:
+    """
+    Drift from target and the trades that fix it.
+
+    Args:
+        holdings: plaid_service.get_investment_holdings()['holdings']
+        target_allocation: ticker -> target percent
+        new_contribution: New money to invest alongside the rebalance
+        contributions_only: Only buy (with new money and idle cash), never sell
+        drift_threshold: Percentage points of drift that call for a rebalance
+        min_trade_amount: Trades smaller than this are skipped
+
+    Returns:
+        Per-ticker drift, trade list and totals
+    """
+    held_keys, held_values, held_quantities = aggregate_holdings(holdings)
+
+    # Align held positions and targets on one ticker axis
+    keys = np.union1d(held_keys, np.array(list(target_allocation), dtype=str))
+    current = np.zeros(len(keys))
+    quantity = np.zeros(len(keys))
+    if len(held_keys):
+        positions = np.searchsorted(keys, held_keys)
+        current[positions] = held_values
+        quantity[positions] = held_quantities
+    target_pct = np.array([target_allocation.get(k, 0.0) for k in keys])
+    is_cash = keys == CASH_KEY
+
+    total_value = current.sum()
+    current_pct = current / total_value * 100 if total_value > 0 else np.zeros(len(keys))
+    drift = current_pct - target_pct
+    price = np.divide(current, quantity, out=np.full(len(keys), np.nan), where=quantity > 0)
+
+    if contributions_only:
+        # Idle cash is spent like new money; nothing else is sold
+        budget = new_contribution + current[is_cash].sum()
+        invested = np.where(is_cash, 0.0, current)
+        trades = _contribution_only_buys(invested, target_pct / 100 * (invested.sum() + budget), budget)
+        trades[is_cash] = -current[is_cash]
+    else:
+        trades = target_pct / 100 * (total_value + new_contribution) - current
+
+    trades[np.abs(trades) < min_trade_amount] = 0.0
+    after = current + trades
+    after_pct = after / after.sum() * 100 if after.sum() > 0 else np.zeros(len(keys))
+
+    order = np.argsort(-np.abs(drift))
+    positions = []
+    trade_list = []
+    for i in order:
+        positions.append({
+            'ticker': str(keys[i]),
+            'current_value': round(float(current[i]), 2),
+            'current_percent': round(float(current_pct[i]), 2),
+            'target_percent': round(float(target_pct[i]), 2),
+            'drift': round(float(drift[i]), 2),
+            'percent_after_trades': round(float(after_pct[i]), 2)
+        })
+        if trades[i] != 0 and not is_cash[i]:
+            trade_list.append({
+                'ticker': str(keys[i]),
+                'action': 'buy' if trades[i] > 0 else 'sell',
+                'amount': round(float(abs(trades[i])), 2),
+                'estimated_shares': round(float(abs(trades[i]) / price[i]), 4) if np.isfinite(price[i]) else None
+            })
+
+    max_drift = float(np.abs(drift).max()) if len(drift) else 0.0
+    return {
+        'total_value': round(float(total_value), 2),
+        'new_contribution': new_contribution,
+        'contributions_only': contributions_only,
+        'holdings_aggregated': len(holdings),
+        'max_drift': round(max_drift, 2),
+        'rebalance_recommended': max_drift > drift_threshold,
+        'positions': positions,
+        'trades': trade_list,
+        'total_buys': round(float(trades[(trades > 0) & ~is_cash].sum()), 2),
+        'total_sells': round(float(abs(trades[(trades < 0) & ~is_cash].sum())), 2),
+        'max_drift_after_trades': round(float(np.abs(after_pct - target_pct).max()), 2) if len(keys) else 0.0
+    }
@@ -4,9 +4,34 @@ Generates personalized investment recommendations based on portfolio value and r
 Includes real-time market data for recommended ETFs
 """
 
-from typing import Dict, List
+from typing import Dict, List, Tuple
 from app.services import market_data_service
 
+# How the stock slice is split between US large cap, US small/mid cap and international
+STOCK_SPLIT = {"VOO": 0.50, "VXF": 0.20, "VXUS": 0.30}
+
+
+def get_risk_profile(risk_tolerance: int) -> Tuple[str, float, float, float]:
+    """(profile name, stocks %, bonds %, cash %) for a 1-10 risk tolerance"""
+    if risk_tolerance <= 3:
+        return "conservative", 40, 50, 10
+    elif risk_tolerance <= 6:
+        return "moderate", 60, 30, 10
+    return "aggressive", 80, 15, 5
+
+
+def get_allocation(risk_tolerance: int) -> Dict[str, float]:
+    """
+    Ticker -> percent of the portfolio for a 1-10 risk tolerance (HYSA is the cash slice).
+
+    Pure lookup, no market data: use this when only the percentages are needed.
+    """
+    _, stocks_percent, bonds_percent, cash_percent = get_risk_profile(risk_tolerance)
+    allocation = {ticker: stocks_percent * share for ticker, share in STOCK_SPLIT.items()}
+    allocation["BND"] = bonds_percent
+    allocation["HYSA"] = cash_percent
+    return allocation
+
 
 def generate_investment_plan(
     total_portfolio_value: float,
@@ -30,21 +55,8 @@ def generate_investment_plan(
     """
 
     # Determine risk profile
-    if risk_tolerance <= 3:
-        risk_profile = "conservative"
-        stocks_percent = 40
-        bonds_percent = 50
-        cash_percent = 10
-    elif risk_tolerance <= 6:
-        risk_profile = "moderate"
-        stocks_percent = 60
-        bonds_percent = 30
-        cash_percent = 10
-    else:
-        risk_profile = "aggressive"
-        stocks_percent = 80
-        bonds_percent = 15
-        cash_percent = 5
+    risk_profile, stocks_percent, bonds_percent, cash_percent = get_risk_profile(risk_tolerance)
+    allocation = get_allocation(risk_tolerance)
 
     # Calculate dollar amounts
     stocks_amount = total_portfolio_value * (stocks_percent / 100)
@@ -58,7 +70,7 @@ def generate_investment_plan(
     # Stock allocation
     if stocks_percent > 0:
         # US Large Cap
-        us_large_cap_percent = stocks_percent * 0.50
+        us_large_cap_percent = allocation['VOO']
         tickers_to_fetch.append('VOO')
         recommendations.append({
             'category': 'US Large Cap Stocks',
@@ -71,7 +83,7 @@ def generate_investment_plan(
         })
 
         # US Small/Mid Cap
-        us_small_cap_percent = stocks_percent * 0.20
+        us_small_cap_percent = allocation['VXF']
         tickers_to_fetch.append('VXF')
         recommendations.append({
             'category': 'US Small/Mid Cap Stocks',
@@ -84,7 +96,7 @@ def generate_investment_plan(
         })
 
         # International
-        intl_percent = stocks_percent * 0.30
+        intl_percent = allocation['VXUS']
         tickers_to_fetch.append('VXUS')
         recommendations.append({
             'category': 'International Stocks',
@@ -99,7 +111,7 @@ def generate_investment_plan(
     # Bond allocation
     if bonds_percent > 0:
         # Total Bond Market
-        bond_percent = bonds_percent
+        bond_percent = allocation['BND']
         tickers_to_fetch.append('BND')
         recommendations.append({
             'category': 'US Bonds',
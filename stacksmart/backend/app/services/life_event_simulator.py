@@ -0,0 +1,209 @@
+"""
+Life Event Simulator
+
+Simulates debts and investments across a timeline of life events:
+graduation (deferment ends), first salary, raises, new loans, windfalls.
+
+The timeline is split into segments at every event. Inside a segment nothing
+changes, so the whole segment is projected at once with the array kernels from
+optimization_engine. A loan being paid off also ends a segment, so its freed-up
+payment rolls to the next loan (avalanche) or into investments.
+
+Each month's savings pay every minimum first. The rest goes to the highest-rate
+loan when multi_loan_optimizer's rule says paying debt beats investing, and is
+invested otherwise. A shortfall against the minimums comes out of investments.
+"""
+
+from typing import Dict
+import numpy as np
+from app.models.schemas import LifeEventSimulationRequest, LifeEvent, LifeEventType, LoanType
+from app.services.optimization_engine import project_loan_balances, project_investment_values
+from app.services.multi_loan_optimizer import recommend_debt_or_invest
+
+PAID_OFF_THRESHOLD = 0.01
+
+
+def _new_loan(loan, deferred: bool = False) -> Dict:
+    return {
+        "name": loan.loan_name,
+        "loan_type": loan.loan_type.value,
+        "balance": float(loan.principal),
+        "rate": float(loan.interest_rate),
+        "minimum_payment": float(loan.minimum_payment),
+        "deferred": deferred,
+        "payoff_month": None
+    }
+
+
+def _apply_event(event: LifeEvent, state: Dict) -> None:
+    """Update simulation state for one event"""
+    if event.event_type in (LifeEventType.FIRST_SALARY, LifeEventType.SAVINGS_CHANGE):
+        state["monthly_savings"] = max(0.0, event.amount or 0.0)
+    elif event.event_type == LifeEventType.RAISE:
+        state["monthly_savings"] = max(0.0, state["monthly_savings"] + (event.amount or 0.0))
+    elif event.event_type == LifeEventType.WINDFALL:
+        state["investments"] += event.amount or 0.0
+    elif event.event_type == LifeEventType.NEW_LOAN and event.loan is not None:
+        state["loans"].append(_new_loan(event.loan))
+    elif event.event_type == LifeEventType.GRADUATION:
+        for loan in state["loans"]:
+            if loan["loan_type"] == LoanType.STUDENT_LOAN.value:
+                loan["deferred"] = False
+    elif event.event_type == LifeEventType.DEFERMENT_END:
+        for loan in state["loans"]:
+            if event.loan_name is None or loan["name"] == event.loan_name:
+                loan["deferred"] = False
+
+
+def _run_segment(state: Dict, months: int, annual_return: float) -> Dict:
+    """
+    Project one segment with fixed payments and contributions.
+
+    Stops early at the first month a loan is paid off.
+
+    Returns:
+        Month count actually simulated plus debt and investment curves
+    """
+    loans = state["loans"]
+    balances = np.array([loan["balance"] for loan in loans])
+    rates = np.array([loan["rate"] for loan in loans])
+    open_loans = balances > PAID_OFF_THRESHOLD
+    payable = open_loans & ~np.array([loan["deferred"] for loan in loans], dtype=bool)
+
+    payments = np.where(payable, [loan["minimum_payment"] for loan in loans], 0.0)
+    leftover = state["monthly_savings"] - payments.sum()
+    contribution = leftover
+
+    if payable.any() and leftover > 0:
+        target = int(np.argmax(np.where(payable, rates, -np.inf)))
+        recommendation, _ = recommend_debt_or_invest(rates[target], annual_return)
+        if recommendation == "pay_debts":
+            payments[target] += leftover
+            contribution = 0.0
+
+    debt_paths = project_loan_balances(balances, rates, np.repeat(payments[:, None], months, axis=1))
+
+    # End the segment at the first payoff so the payment can be reassigned
+    paid_off = (debt_paths <= PAID_OFF_THRESHOLD) & (payments > 0)[:, None] & open_loans[:, None]
+    payoff_months = np.where(paid_off.any(axis=1), paid_off.argmax(axis=1), months)
+    length = int(min(months, payoff_months.min() + 1)) if len(loans) else months
+    debt_paths = debt_paths[:, :length]
+
+    investment_path = project_investment_values(state["investments"], np.full(length, contribution), annual_return)
+
+    # The last payment on a loan is usually more than what was owed; invest the difference
+    refund = 0.0
+    for i in np.flatnonzero(payoff_months == length - 1):
+        owed_before = balances[i] if length == 1 else debt_paths[i, length - 2]
+        refund += max(0.0, payments[i] - owed_before * (1 + rates[i] / 12))
+
+    return {
+        "length": length,
+        "debt_paths": debt_paths,
+        "investment_path": investment_path,
+        "refund": refund,
+        "paid_off": np.flatnonzero(payoff_months == length - 1)
+    }
+
+
+def simulate_life_events(request: LifeEventSimulationRequest) -> Dict:
+    """
+    Simulate net worth across a timeline of life events.
+
+    Args:
+        request: Current loans and savings plus the event timeline
+
+    Returns:
+        Monthly net worth, debt and investment curves (month 0 = today),
+        net worth at each event, and payoff month for every loan
+    """
+    total_months = request.months
+    annual_return = request.market_assumptions.expected_annual_return
+
+    deferring = request.months_until_graduation is not None and request.months_until_graduation > 0
+    state = {
+        "loans": [
+            _new_loan(loan, deferred=deferring and loan.loan_type == LoanType.STUDENT_LOAN)
+            for loan in request.loans
+        ],
+        "monthly_savings": request.monthly_savings,
+        "investments": request.current_savings
+    }
+
+    events = list(request.events)
+    if request.months_until_graduation is not None:
+        events.append(LifeEvent(
+            month=request.months_until_graduation,
+            event_type=LifeEventType.GRADUATION,
+            description="Graduation - student loan payments begin"
+        ))
+    events = sorted((e for e in events if e.month < total_months), key=lambda e: e.month)
+
+    debt_curve = np.zeros(total_months + 1)
+    investment_curve = np.zeros(total_months + 1)
+    event_log = []
+    segments = 0
+    month = 0
+    next_event = 0
+
+    while True:
+        # Apply every event scheduled for this month
+        while next_event < len(events) and events[next_event].month <= month:
+            event = events[next_event]
+            _apply_event(event, state)
+            event_log.append({
+                "month": month,
+                "event_type": event.event_type.value,
+                "description": event.description,
+                "monthly_savings": round(state["monthly_savings"], 2)
+            })
+            next_event += 1
+
+        debt_curve[month] = sum(loan["balance"] for loan in state["loans"])
+        investment_curve[month] = state["investments"]
+        if month >= total_months:
+            break
+
+        segment_end = events[next_event].month if next_event < len(events) else total_months
+        segment = _run_segment(state, segment_end - month, annual_return)
+        length = segment["length"]
+        segments += 1
+
+        for i, loan in enumerate(state["loans"]):
+            loan["balance"] = float(segment["debt_paths"][i, -1])
+        for i in segment["paid_off"]:
+            state["loans"][i]["balance"] = 0.0
+            state["loans"][i]["payoff_month"] = month + length
+        state["investments"] = float(segment["investment_path"][-1]) + segment["refund"]
+
+        span = slice(month + 1, month + length + 1)
+        debt_curve[span] = segment["debt_paths"].sum(axis=0)
+        investment_curve[span] = segment["investment_path"]
+        month += length
+
+    investment_curve[month] = state["investments"]
+    net_worth = investment_curve - debt_curve
+
+    for entry in event_log:
+        entry["net_worth"] = round(float(net_worth[entry["month"]]), 2)
+
+    debt_free = np.flatnonzero(debt_curve <= PAID_OFF_THRESHOLD)
+    return {
+        "months": list(range(total_months + 1)),
+        "net_worth": np.round(net_worth, 2).tolist(),
+        "total_debt": np.round(debt_curve, 2).tolist(),
+        "investments": np.round(investment_curve, 2).tolist(),
+        "events": event_log,
+        "loans": [
+            {
+                "loan_name": loan["name"],
+                "loan_type": loan["loan_type"],
+                "payoff_month": loan["payoff_month"],
+                "remaining_balance": round(loan["balance"], 2)
+            }
+            for loan in state["loans"]
+        ],
+        "debt_free_month": int(debt_free[0]) if len(debt_free) and debt_curve[0] > PAID_OFF_THRESHOLD else None,
+        "final_net_worth": round(float(net_worth[-1]), 2),
+        "segments_simulated": segments
+    }
@@ -0,0 +1,140 @@
+"""
+US Equity Market Calendar
+
+NYSE regular sessions (9:30-16:00 America/New_York on weekdays), full-day
+holidays and 1 p.m. early closes, computed locally from the exchange's
+published rules so no calendar service or network call is needed.
+
+Market data can only change while a session is open, so cache expiry follows
+the calendar: an entry stored during a session expires after its TTL, and an
+entry stored after the close (or on a weekend or holiday) stays valid until
+the next open.
+"""
+
+import functools
+import time as clock
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+EXCHANGE_TZ = ZoneInfo("America/New_York")
+MARKET_OPEN = time(9, 30)
+MARKET_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+CLOSE_SETTLE_MINUTES = 15  # Closing prices can still be revised shortly after the bell
+MAX_CLOSURE_SECONDS = 5 * 24 * 3600  # Longer than any gap between sessions (holiday weekends)
+
+MONDAY, THURSDAY, FRIDAY, SATURDAY, SUNDAY = 0, 3, 4, 5, 6
+
+
+def _observed(day: date) -> date:
+    """Holidays on a Saturday are observed Friday, on a Sunday the next Monday"""
+    if day.weekday() == SATURDAY:
+        return day - timedelta(days=1)
+    if day.weekday() == SUNDAY:
+        return day + timedelta(days=1)
+    return day
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """n-th given weekday of a month (n=-1 for the last one)"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year: int) -> date:
+    """Western Easter Sunday (anonymous Gregorian algorithm)"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+@functools.lru_cache(maxsize=None)
+def _special_days(year: int) -> Dict[date, Optional[time]]:
+    """Non-regular days of a year: date -> early close time, or None for a full-day holiday"""
+    days: Dict[date, Optional[time]] = {}
+
+    # New Year's Day falling on a Saturday is not observed on the Friday before
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != SATURDAY:
+        days[_observed(new_year)] = None
+
+    days[_nth_weekday(year, 1, MONDAY, 3)] = None  # Martin Luther King Jr. Day
+    days[_nth_weekday(year, 2, MONDAY, 3)] = None  # Washington's Birthday
+    days[_easter(year) - timedelta(days=2)] = None  # Good Friday
+    days[_nth_weekday(year, 5, MONDAY, -1)] = None  # Memorial Day
+    if year >= 2022:
+        days[_observed(date(year, 6, 19))] = None  # Juneteenth
+    days[_observed(date(year, 7, 4))] = None  # Independence Day
+    days[_nth_weekday(year, 9, MONDAY, 1)] = None  # Labor Day
+    thanksgiving = _nth_weekday(year, 11, THURSDAY, 4)
+    days[thanksgiving] = None
+    days[_observed(date(year, 12, 25))] = None  # Christmas
+
+    # Early closes: July 3rd and Christmas Eve when they fall Monday-Thursday, and Black Friday
+    for eve in (date(year, 7, 3), date(year, 12, 24)):
+        if eve.weekday() <= THURSDAY:
+            days.setdefault(eve, EARLY_CLOSE)
+    days.setdefault(thanksgiving + timedelta(days=1), EARLY_CLOSE)
+    return days
+
+
+def session(day: date) -> Optional[Tuple[datetime, datetime]]:
+    """(open, close) in exchange time for a trading day, or None if the market is closed all day"""
+    if day.weekday() >= SATURDAY:
+        return None
+    special = _special_days(day.year)
+    if day in special and special[day] is None:
+        return None
+    close = special.get(day) or MARKET_CLOSE
+    return (
+        datetime.combine(day, MARKET_OPEN, tzinfo=EXCHANGE_TZ),
+        datetime.combine(day, close, tzinfo=EXCHANGE_TZ)
+    )
+
+
+def is_market_open(now: Optional[float] = None) -> bool:
+    """True during a regular session (now is a Unix time, default the current time)"""
+    moment = datetime.fromtimestamp(clock.time() if now is None else now, EXCHANGE_TZ)
+    hours = session(moment.date())
+    return hours is not None and hours[0] <= moment < hours[1]
+
+
+def next_open(after: datetime) -> datetime:
+    """Start of the first session opening after `after` (an aware datetime)"""
+    day = after.astimezone(EXCHANGE_TZ).date()
+    while True:
+        hours = session(day)
+        if hours is not None and hours[0] > after:
+            return hours[0]
+        day += timedelta(days=1)
+
+
+def expires_at(stored_at: float, ttl_seconds: float) -> float:
+    """
+    Unix time when data stored at stored_at stops being fresh.
+
+    Stored during a session (or within CLOSE_SETTLE_MINUTES after its close):
+    stored_at + ttl_seconds. Otherwise prices can't move before the next open,
+    so the entry lasts until then.
+    """
+    moment = datetime.fromtimestamp(stored_at, EXCHANGE_TZ)
+    hours = session(moment.date())
+    if hours is not None and hours[0] <= moment < hours[1] + timedelta(minutes=CLOSE_SETTLE_MINUTES):
+        return stored_at + ttl_seconds
+    return next_open(moment).timestamp()
+
+
+def is_fresh(stored_at: float, ttl_seconds: float, now: Optional[float] = None) -> bool:
+    """True if data stored at stored_at (Unix time) hasn't expired per expires_at"""
+    return (clock.time() if now is None else now) < expires_at(stored_at, ttl_seconds)
@@ -4,125 +4,333 @@ Real Market Data Fetcher
 Fetches live market data for ETFs (VOO, VXUS, BND, SPY, etc.)
 Uses yfinance library for reliable Yahoo Finance data
 Includes caching and rate limiting to avoid 429 errors
+
+Daily closes are kept in price_history_store on disk; a cache miss only
+downloads bars newer than the last stored date. Results are cached in-process
+(L1) and in shared_cache (L2), which every worker on the host reads.
+
+Expiry follows market_calendar: CACHE_TTL_MINUTES applies to data fetched
+during a trading session; data fetched after the close stays fresh until the
+next open. Expired entries are served stale-while-revalidate: the old value is
+returned immediately and refreshed in a background thread, up to
+MAX_STALE_MINUTES past expiry.
 """
 
 import yfinance as yf
-from typing import Dict, Optional, List
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, Optional, List
 from datetime import datetime, timedelta
 import threading
 import time
+from app.services import price_history_store, shared_cache, rate_limiter, market_calendar
+from app.services.single_flight import SingleFlight
 
-# Simple in-memory cache with TTL
+# Simple in-memory cache with TTL (L1 in front of shared_cache)
+SHARED_CACHE_NAMESPACE = "market_data_fetcher"
 _cache: Dict[str, Dict] = {}
 _cache_lock = threading.Lock()
-CACHE_TTL_MINUTES = 30  # Cache data for 30 minutes to reduce API calls
+CACHE_TTL_MINUTES = 30  # Cache data for 30 minutes during market hours to reduce API calls
+MAX_STALE_MINUTES = 24 * 60  # Past expiry, serve the old value while refreshing for up to a day
+
+# Concurrent cache misses for the same key share one fetch
+_fetches = SingleFlight()
+
+# Keys being refreshed in the background (one refresh per key at a time)
+_revalidating = set()
+_revalidation = threading.local()
+
+HISTORY_DAYS = 365  # Trailing window the returns are computed over
+
+# ETF expense ratios (static data)
+EXPENSE_RATIOS = {
+    "VOO": 0.03, "VXUS": 0.07, "BND": 0.03, "VTI": 0.03,
+    "QQQ": 0.20, "AGG": 0.03, "VNQ": 0.12, "VWO": 0.08,
+    "SCHD": 0.06, "VIG": 0.06, "DGRO": 0.08
+}
 
-# Rate limiting
-_last_api_call = datetime.min
-_rate_limit_lock = threading.Lock()
-MIN_REQUEST_INTERVAL = 1.0  # Minimum seconds between API calls
+# Incremented on every successful price download so derived caches
+# (efficient frontier, risk statistics, plans) know when to rebuild
+_market_data_version = 0
 
 
 def _rate_limit():
-    """Enforce rate limiting between API calls"""
-    global _last_api_call
-    with _rate_limit_lock:
-        now = datetime.now()
-        elapsed = (now - _last_api_call).total_seconds()
-        if elapsed < MIN_REQUEST_INTERVAL:
-            time.sleep(MIN_REQUEST_INTERVAL - elapsed)
-        _last_api_call = datetime.now()
-
-
-def _get_cached(key: str) -> Optional[Dict]:
-    """Get cached data if not expired"""
+    """Wait for a yfinance token (only this thread waits; see rate_limiter)"""
+    rate_limiter.acquire_blocking("yfinance")
+
+
+def _is_usable(timestamp: datetime) -> bool:
+    """True if an entry is fresh or expired less than MAX_STALE_MINUTES ago"""
+    expires = market_calendar.expires_at(timestamp.timestamp(), CACHE_TTL_MINUTES * 60)
+    return time.time() < expires + MAX_STALE_MINUTES * 60
+
+
+def _get_entry(key: str) -> Optional[tuple]:
+    """(data, timestamp) still usable (see _is_usable), from this worker or the shared tier"""
     with _cache_lock:
         if key in _cache:
             data, timestamp = _cache[key]
-            if datetime.now() - timestamp < timedelta(minutes=CACHE_TTL_MINUTES):
-                return data
+            if _is_usable(timestamp):
+                return data, timestamp
             else:
                 del _cache[key]
+
+    # Entries from before a weekend or holiday are older than the TTL but may still be fresh
+    shared = shared_cache.get(
+        SHARED_CACHE_NAMESPACE, key, MAX_STALE_MINUTES * 60 + market_calendar.MAX_CLOSURE_SECONDS
+    )
+    if shared is None:
+        return None
+    data, stored_at = shared
+    # Keep the original timestamp so the entry expires when the shared one does
+    entry = (data, datetime.fromtimestamp(stored_at))
+    if not _is_usable(entry[1]):
+        return None
+    with _cache_lock:
+        _cache[key] = entry
+    return entry
+
+
+def _revalidate(key: str, refresh: Callable[[], Any]) -> None:
+    """Run refresh in a background thread unless one is already running for key"""
+    with _cache_lock:
+        if key in _revalidating:
+            return
+        _revalidating.add(key)
+
+    def _run():
+        # Inside the refresh, stale entries count as misses so the fetch really happens
+        _revalidation.active = True
+        try:
+            refresh()
+        except Exception as e:
+            print(f"[ERROR] Background refresh failed for {key}: {str(e)}")
+        finally:
+            with _cache_lock:
+                _revalidating.discard(key)
+
+    threading.Thread(target=_run, name=f"revalidate-{key}", daemon=True).start()
+
+
+def _is_fresh(timestamp: datetime) -> bool:
+    return market_calendar.is_fresh(timestamp.timestamp(), CACHE_TTL_MINUTES * 60)
+
+
+def _get_cached(key: str, refresh: Optional[Callable[[], Any]] = None) -> Optional[Any]:
+    """
+    Get cached data if not expired.
+
+    With refresh, an entry expired less than MAX_STALE_MINUTES ago is returned
+    as is and refresh() runs in the background to replace it.
+    """
+    entry = _get_entry(key)
+    if entry is None:
+        return None
+
+    data, timestamp = entry
+    if _is_fresh(timestamp):
+        return data
+    if refresh is not None and not getattr(_revalidation, "active", False):
+        print(f"[CACHE] Serving stale {key} while refreshing")
+        _revalidate(key, refresh)
+        return data
     return None
 
 
 def _set_cache(key: str, data: Dict) -> None:
     """Store data in cache"""
+    now = datetime.now()
+    with _cache_lock:
+        _cache[key] = (data, now)
+    shared_cache.put(SHARED_CACHE_NAMESPACE, key, data, now.timestamp())
+
+
+def _bump_market_data_version() -> None:
+    """Record that fresh prices were downloaded (in every worker)"""
+    global _market_data_version
+    shared_version = shared_cache.increment("market_data_version")
     with _cache_lock:
-        _cache[key] = (data, datetime.now())
+        _market_data_version = shared_version if shared_version is not None else _market_data_version + 1
+
+
+def get_market_data_version() -> int:
+    """Current market data version (changes whenever any worker refreshes prices)"""
+    shared_version = shared_cache.get_counter("market_data_version")
+    return shared_version if shared_version is not None else _market_data_version
+
+
+def _is_checked(ticker: str) -> bool:
+    """True if the ticker's stored history was checked against the provider since it last expired"""
+    checked_at = price_history_store.checked_at(ticker)
+    return checked_at is not None and market_calendar.is_fresh(checked_at, CACHE_TTL_MINUTES * 60)
+
+
+def _download_closes(tickers: List[str], start: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """Daily closes for tickers (all columns present), or None if the download failed"""
+    try:
+        _rate_limit()
+        if start:
+            print(f"[DEBUG] Downloading bars since {start} for {len(tickers)} tickers: {', '.join(tickers)}")
+            data = yf.download(tickers, start=start, progress=False, threads=False)
+        else:
+            print(f"[DEBUG] Downloading price history for {len(tickers)} tickers: {', '.join(tickers)}")
+            data = yf.download(tickers, period="1y", progress=False, threads=False)
+    except Exception as e:
+        print(f"[ERROR] Price history download failed: {str(e)}")
+        return None
+
+    if data is None or data.empty:
+        return pd.DataFrame(columns=tickers, dtype=float)
+    return data["Close"].reindex(columns=tickers)
+
+
+def _refresh_history(tickers: List[str], force: bool = False) -> None:
+    """
+    Bring the on-disk history up to date for tickers whose last provider check
+    has expired (or for every ticker with force).
+
+    Tickers already in the store only download bars from their last stored
+    date onward; new tickers download a full year in a separate request, so
+    one new ticker doesn't turn the top-up into a full-year download. Tickers
+    the provider returns nothing for are marked checked, so they aren't
+    retried until the check expires.
+    """
+    stale = [t for t in tickers if force or not _is_checked(t)]
+    if not stale:
+        return
+
+    last_dates = {t: price_history_store.last_date(t) for t in stale}
+    known = [t for t in stale if last_dates[t]]
+    new = [t for t in stale if not last_dates[t]]
+
+    added = 0
+    batches = [(known, min(last_dates[t] for t in known).isoformat())] if known else []
+    if new:
+        batches.append((new, None))
+    for batch, start in batches:
+        closes = _download_closes(batch, start)
+        if closes is None:
+            continue
+        for ticker in batch:
+            column = closes[ticker].dropna()
+            added += price_history_store.append(ticker, column.index.to_numpy(dtype="datetime64[D]"), column.to_numpy())
+
+    if added:
+        _bump_market_data_version()
+    print(f"[DEBUG] Price history store: {added} new bars for {len(stale)} tickers")
+
+
+def _load_closes(tickers: List[str]) -> pd.DataFrame:
+    """Trailing year of daily closes (one column per ticker) from the history store"""
+    _refresh_history(tickers)
+    since = (datetime.now() - timedelta(days=HISTORY_DAYS)).date()
+    return price_history_store.get_closes(tickers, since)
+
+
+def _etf_cache_key(ticker: str) -> str:
+    return f"etf_{ticker}"
 
 
 def _batch_download_etfs(tickers: List[str]) -> Dict:
     """
     Download multiple ETFs in a single batch request to avoid rate limiting.
     Returns dict of ticker -> data
+
+    Cached per ticker: only tickers missing from the cache are downloaded, and
+    expired ones are refreshed together in the background.
     """
-    cache_key = f"batch_{'_'.join(sorted(tickers))}"
-    cached = _get_cached(cache_key)
-    if cached:
-        print(f"[CACHE] Using cached batch data for {len(tickers)} ETFs")
-        return cached
+    results = {}
+    missing, stale = [], []
+    revalidating = getattr(_revalidation, "active", False)
+    for ticker in dict.fromkeys(tickers):
+        entry = _get_entry(_etf_cache_key(ticker))
+        if entry is None or (revalidating and not _is_fresh(entry[1])):
+            missing.append(ticker)
+            continue
+        results[ticker] = entry[0]
+        if not _is_fresh(entry[1]):
+            stale.append(ticker)
+
+    if stale:
+        print(f"[CACHE] Serving stale data for {len(stale)} ETFs while refreshing")
+        _revalidate(f"batch_{'_'.join(sorted(stale))}", lambda: _batch_download_etfs(stale))
+    if results:
+        print(f"[CACHE] Using cached data for {len(results)} of {len(tickers)} ETFs")
+    if missing:
+        batch_key = f"batch_{'_'.join(sorted(missing))}"
+        results.update(_fetches.do(batch_key, lambda: _fetch_batch(missing)))
+
+    return {ticker: results[ticker] for ticker in tickers}
+
+
+def _etf_metrics(closes: pd.DataFrame) -> Dict[str, Dict]:
+    """
+    Price, daily change, 1-year and YTD return for every column of a closes frame at once.
 
+    Each ticker's first, previous, latest and first-of-year closes are picked
+    with column-wise argmax over the valid-price mask, so the cost barely grows
+    with the number of tickers. Tickers with no prices are left out.
+    """
+    prices = closes.to_numpy(dtype=float)
+    valid = ~np.isnan(prices)
+    has_data = valid.any(axis=0) if len(prices) else np.zeros(prices.shape[1], dtype=bool)
+    if not has_data.any():
+        return {}
+
+    num_rows = len(prices)
+    columns = np.arange(prices.shape[1])
+    first = np.argmax(valid, axis=0)
+    last = num_rows - 1 - np.argmax(valid[::-1], axis=0)
+
+    # Previous close: the last valid price before the latest one
+    before_last = valid & (np.arange(num_rows)[:, None] < last[None, :])
+    has_previous = before_last.any(axis=0)
+    previous = np.where(has_previous, num_rows - 1 - np.argmax(before_last[::-1], axis=0), last)
+
+    # First close of the current year
+    this_year = valid & (closes.index.year == datetime.now().year)[:, None]
+    has_ytd = this_year.any(axis=0)
+    year_start = np.argmax(this_year, axis=0)
+
+    current_price = prices[last, columns]
+    previous_close = prices[previous, columns]
+    first_price = prices[first, columns]
+    year_start_price = prices[year_start, columns]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change_percent = np.where(previous_close > 0, (current_price - previous_close) / previous_close * 100, 0.0)
+        one_year_return = np.where(first_price > 0, (current_price - first_price) / first_price * 100, np.nan)
+        ytd_return = np.where(has_ytd & (year_start_price > 0), (current_price - year_start_price) / year_start_price * 100, np.nan)
+
+    last_updated = datetime.now().isoformat()
+    results = {}
+    for i in np.flatnonzero(has_data):
+        ticker = closes.columns[i]
+        results[ticker] = {
+            "ticker": ticker,
+            "price": round(float(current_price[i]), 2),
+            "change_percent_today": round(float(change_percent[i]), 2),
+            "ytd_return": round(float(ytd_return[i]), 2) if np.isfinite(ytd_return[i]) and ytd_return[i] else None,
+            "one_year_return": round(float(one_year_return[i]), 2) if np.isfinite(one_year_return[i]) and one_year_return[i] else None,
+            "expense_ratio": EXPENSE_RATIOS.get(ticker, 0.10),
+            "data_source": "Yahoo Finance",
+            "last_updated": last_updated
+        }
+    return results
+
+
+def _fetch_batch(tickers: List[str]) -> Dict:
+    """Download the given ETFs and cache each one"""
     try:
-        _rate_limit()
-        print(f"[DEBUG] Batch downloading {len(tickers)} ETFs: {', '.join(tickers)}")
-
-        # Download all tickers at once
-        data = yf.download(tickers, period="1y", group_by='ticker', progress=False, threads=False, multi_level_index=False)
-
-        results = {}
-        for ticker in tickers:
-            try:
-                if len(tickers) == 1:
-                    hist = data
-                else:
-                    hist = data[ticker] if ticker in data.columns.get_level_values(0) else None
-
-                if hist is None or hist.empty:
-                    results[ticker] = get_demo_etf_data(ticker)
-                    continue
-
-                # Get current and historical prices
-                current_price = float(hist['Close'].iloc[-1])
-                previous_close = float(hist['Close'].iloc[-2]) if len(hist) > 1 else current_price
-                first_price = float(hist['Close'].iloc[0])
-
-                # Calculate returns
-                change_percent = ((current_price - previous_close) / previous_close) * 100 if previous_close > 0 else 0
-                one_year_return = ((current_price - first_price) / first_price) * 100 if first_price > 0 else None
-
-                # Calculate YTD return
-                ytd_return = None
-                current_year = datetime.now().year
-                ytd_data = hist[hist.index.year == current_year]
-                if not ytd_data.empty:
-                    year_start_price = float(ytd_data['Close'].iloc[0])
-                    if year_start_price > 0:
-                        ytd_return = ((current_price - year_start_price) / year_start_price) * 100
-
-                # ETF expense ratios (static data)
-                expense_ratios = {
-                    "VOO": 0.03, "VXUS": 0.07, "BND": 0.03, "VTI": 0.03,
-                    "QQQ": 0.20, "AGG": 0.03, "VNQ": 0.12, "VWO": 0.08,
-                    "SCHD": 0.06, "VIG": 0.06, "DGRO": 0.08
-                }
-
-                results[ticker] = {
-                    "ticker": ticker,
-                    "price": round(current_price, 2),
-                    "change_percent_today": round(change_percent, 2),
-                    "ytd_return": round(ytd_return, 2) if ytd_return else None,
-                    "one_year_return": round(one_year_return, 2) if one_year_return else None,
-                    "expense_ratio": expense_ratios.get(ticker, 0.10),
-                    "data_source": "Yahoo Finance",
-                    "last_updated": datetime.now().isoformat()
-                }
-            except Exception as e:
-                print(f"[ERROR] Failed to process {ticker}: {str(e)}")
-                results[ticker] = get_demo_etf_data(ticker)
-
-        _set_cache(cache_key, results)
-        print(f"[DEBUG] Batch download complete for {len(results)} ETFs")
+        # Update all tickers at once
+        closes = _load_closes(tickers)
+
+        metrics = _etf_metrics(closes)
+        results = {ticker: metrics.get(ticker) or get_demo_etf_data(ticker) for ticker in tickers}
+
+        for ticker, data in results.items():
+            _set_cache(_etf_cache_key(ticker), data)
+        print(f"[DEBUG] Batch data ready for {len(results)} ETFs")
         return results
 
     except Exception as e:
@@ -140,23 +348,27 @@ def get_voo_live_data() -> Dict:
     - 5-year average annual return
     """
     # Check cache first
-    cached = _get_cached("VOO_live")
+    cached = _get_cached("VOO_live", refresh=get_voo_live_data)
     if cached:
         return cached
 
+    return _fetches.do("VOO_live", _fetch_voo_live_data)
+
+
+def _fetch_voo_live_data() -> Dict:
+    """Build and cache the VOO live data for get_voo_live_data"""
     try:
-        _rate_limit()
-        print("[DEBUG] Fetching live VOO market data with yfinance...")
+        print("[DEBUG] Fetching live VOO market data...")
 
-        # Use download instead of Ticker to avoid quoteSummary endpoint
-        hist = yf.download("VOO", period="1y", progress=False, multi_level_index=False)
+        # Stored history, topped up with any newer bars from yfinance
+        hist = _load_closes(["VOO"])["VOO"].dropna()
 
         if hist.empty:
             return get_default_market_data()
 
-        current_price = float(hist['Close'].iloc[-1])
-        previous_close = float(hist['Close'].iloc[-2]) if len(hist) > 1 else current_price
-        first_price = float(hist['Close'].iloc[0])
+        current_price = float(hist.iloc[-1])
+        previous_close = float(hist.iloc[-2]) if len(hist) > 1 else current_price
+        first_price = float(hist.iloc[0])
 
         # Calculate daily change
         change_percent = ((current_price - previous_close) / previous_close) * 100 if previous_close > 0 else 0
@@ -169,7 +381,7 @@ def get_voo_live_data() -> Dict:
         current_year = datetime.now().year
         ytd_data = hist[hist.index.year == current_year]
         if not ytd_data.empty:
-            year_start_price = float(ytd_data['Close'].iloc[0])
+            year_start_price = float(ytd_data.iloc[0])
             if year_start_price > 0:
                 ytd_return = ((current_price - year_start_price) / year_start_price) * 100
 
@@ -214,19 +426,8 @@ def get_etf_details(ticker_symbol: str) -> Dict:
     Get detailed ETF information including price, returns, and expense ratio.
     Uses batch download for efficiency.
     """
-    # Check cache first
-    cache_key = f"etf_{ticker_symbol}"
-    cached = _get_cached(cache_key)
-    if cached:
-        return cached
-
-    # Use batch download for single ticker
-    results = _batch_download_etfs([ticker_symbol])
-    if ticker_symbol in results:
-        _set_cache(cache_key, results[ticker_symbol])
-        return results[ticker_symbol]
-
-    return get_demo_etf_data(ticker_symbol)
+    # Shares the per-ticker cache with batch downloads
+    return _batch_download_etfs([ticker_symbol])[ticker_symbol]
 
 
 def get_demo_etf_data(ticker: str) -> Dict:
@@ -272,23 +473,55 @@ def get_multiple_etf_data(tickers: list = ["VOO", "VXUS", "BND"]) -> Dict:
     return _batch_download_etfs(tickers)
 
 
+def get_price_history(tickers: List[str]) -> Optional[pd.DataFrame]:
+    """
+    Get one year of daily closing prices for the given tickers.
+
+    Returns a DataFrame indexed by date with one column per ticker,
+    or None if the download fails.
+    """
+    cache_key = f"history_{'_'.join(sorted(tickers))}"
+    cached = _get_cached(cache_key, refresh=lambda: get_price_history(tickers))
+    if cached is not None:
+        return cached
+
+    return _fetches.do(cache_key, lambda: _fetch_price_history(tickers, cache_key))
+
+
+def _fetch_price_history(tickers: List[str], cache_key: str) -> Optional[pd.DataFrame]:
+    try:
+        closes = _load_closes(tickers).dropna(how="all")
+        if closes.empty:
+            return None
+
+        _set_cache(cache_key, closes)
+        return closes
+
+    except Exception as e:
+        print(f"[ERROR] Price history download failed: {str(e)}")
+        return None
+
+
 def get_sp500_performance() -> Dict:
     """
     Get S&P 500 performance data for comparison
     """
     # Check cache first
-    cached = _get_cached("sp500_performance")
+    cached = _get_cached("sp500_performance", refresh=get_sp500_performance)
     if cached:
         return cached
 
+    return _fetches.do("sp500_performance", _fetch_sp500_performance)
+
+
+def _fetch_sp500_performance() -> Dict:
     try:
-        _rate_limit()
-        hist = yf.download("SPY", period="1y", progress=False, multi_level_index=False)
+        hist = _load_closes(["SPY"])["SPY"].dropna()
 
         one_year_return = None
         if not hist.empty:
-            first_price = float(hist['Close'].iloc[0])
-            last_price = float(hist['Close'].iloc[-1])
+            first_price = float(hist.iloc[0])
+            last_price = float(hist.iloc[-1])
             if first_price > 0:
                 one_year_return = ((last_price - first_price) / first_price) * 100
 
@@ -309,3 +542,21 @@ def get_sp500_performance() -> Dict:
             "historical_avg_return": 10.0,
             "error": str(e)
         }
+
+
+def prewarm(tickers: List[str], history_tickers: List[str]) -> None:
+    """
+    Refresh every market data cache entry for a known ticker universe.
+
+    One batched download tops up the history store for all tickers, then the
+    per-ETF, VOO, S&P 500 and price history entries are rebuilt from it, so
+    user requests find them fresh.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    _refresh_history(sorted(set(tickers) | set(history_tickers) | {"VOO", "SPY"}), force=True)
+
+    _fetches.do(f"batch_{'_'.join(sorted(tickers))}", lambda: _fetch_batch(tickers))
+    _fetches.do("VOO_live", _fetch_voo_live_data)
+    _fetches.do("sp500_performance", _fetch_sp500_performance)
+    history_key = f"history_{'_'.join(sorted(history_tickers))}"
+    _fetches.do(history_key, lambda: _fetch_price_history(history_tickers, history_key))
@@ -0,0 +1,71 @@
+"""
+Market Data Prewarming
+
+The ETF universe the personalized planner serves is small and known in
+advance, so instead of letting a user request hit a cold cache, a background
+task refreshes every ticker with one batched download at startup and then on a
+fixed schedule (shorter than the cache TTL).
+
+Only market_data_fetcher (yfinance) caches for that universe are warmed. Not
+prewarmed: investment_planner (/api/investments/create-plan), which reads
+market_data_service (Alpha Vantage, whose daily quota is too small to spend on
+prewarming), and /api/investments/analyze, whose risk metrics price the user's
+own holdings. action_planner uses no market data.
+
+Started from the FastAPI lifespan. With several workers, the first one to run
+records the time in shared_cache and the others skip that round. Rounds are
+also skipped while the market is closed once a round has run since the last
+close, since prices can't change until the next open (see market_calendar).
+"""
+
+import asyncio
+import os
+import time
+from typing import List
+from app.services import (
+    market_data_fetcher,
+    market_calendar,
+    personalized_planner,
+    shared_cache
+)
+
+PREWARM_INTERVAL_MINUTES = float(os.getenv("MARKET_PREWARM_INTERVAL_MINUTES", 25))  # 0 disables
+
+
+def prewarm_universe() -> List[str]:
+    """Every ETF the personalized planner can recommend"""
+    return sorted(personalized_planner.PLANNER_UNIVERSE)
+
+
+def prewarm_market_data() -> None:
+    """One prewarm round (blocking); skipped if the last one (from any worker) is still fresh"""
+    last_run = shared_cache.get(
+        "market_data_prewarmer", "last_run", PREWARM_INTERVAL_MINUTES * 60 / 2 + market_calendar.MAX_CLOSURE_SECONDS
+    )
+    if last_run is not None and market_calendar.is_fresh(last_run[1], PREWARM_INTERVAL_MINUTES * 60 / 2):
+        print("[CACHE] Market data prewarmed recently, skipping")
+        return
+    shared_cache.put("market_data_prewarmer", "last_run", time.time())
+
+    tickers = prewarm_universe()
+    started = time.perf_counter()
+    market_data_fetcher.prewarm(tickers, personalized_planner.PLANNER_UNIVERSE)
+    print(f"[INFO] Prewarmed market data for {len(tickers)} ETFs in {time.perf_counter() - started:.1f}s")
+
+
+async def run_scheduler() -> None:
+    """Prewarm now and then every PREWARM_INTERVAL_MINUTES until cancelled"""
+    while True:
+        try:
+            # Downloads are blocking; keep them off the event loop
+            await asyncio.to_thread(prewarm_market_data)
+        except Exception as e:
+            print(f"[ERROR] Market data prewarm failed: {str(e)}")
+        await asyncio.sleep(PREWARM_INTERVAL_MINUTES * 60)
+
+
+def start_scheduler() -> "asyncio.Task | None":
+    """Start the prewarm loop on the running event loop (None if disabled)"""
+    if PREWARM_INTERVAL_MINUTES <= 0:
+        return None
+    return asyncio.create_task(run_scheduler(), name="market-data-prewarm")
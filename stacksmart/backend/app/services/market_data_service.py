@@ -8,14 +8,43 @@ import requests
 from typing import Dict, Optional
 from datetime import datetime, timedelta
 import time
+from app.services import shared_cache, rate_limiter, market_calendar
+from app.services.single_flight import SingleFlight
 
 # Alpha Vantage API - Free tier: 25 requests/day, 5 requests/minute
 ALPHA_VANTAGE_API_KEY = os.getenv('ALPHA_VANTAGE_API_KEY', 'demo')
 BASE_URL = 'https://www.alphavantage.co/query'
+MAX_RATE_LIMIT_WAIT = 2.0  # Seconds to wait for a rate limit token before using fallback data
 
-# Cache to reduce API calls
+# Cache to reduce API calls (in-process L1 in front of shared_cache, which all workers read)
+SHARED_CACHE_NAMESPACE = "market_data_service"
 _cache = {}
-_cache_duration = 3600  # 1 hour cache
+_cache_duration = 3600  # 1 hour cache during market hours; until the next open otherwise
+
+# Concurrent cache misses for the same key share one API call
+_fetches = SingleFlight()
+
+
+def _get_cached(cache_key: str) -> Optional[Dict]:
+    """Cached result if still fresh per market_calendar, checking the shared tier on a local miss"""
+    if cache_key in _cache:
+        cached_data, cached_time = _cache[cache_key]
+        if market_calendar.is_fresh(cached_time, _cache_duration):
+            return cached_data
+
+    shared = shared_cache.get(
+        SHARED_CACHE_NAMESPACE, cache_key, _cache_duration + market_calendar.MAX_CLOSURE_SECONDS
+    )
+    if shared is None or not market_calendar.is_fresh(shared[1], _cache_duration):
+        return None
+    _cache[cache_key] = shared
+    return shared[0]
+
+
+def _set_cache(cache_key: str, data: Dict) -> None:
+    now = time.time()
+    _cache[cache_key] = (data, now)
+    shared_cache.put(SHARED_CACHE_NAMESPACE, cache_key, data, now)
 
 
 def get_stock_quote(ticker: str) -> Dict:
@@ -35,11 +64,14 @@ def get_stock_quote(ticker: str) -> Dict:
     cache_key = f"quote_{ticker}"
 
     # Check cache
-    if cache_key in _cache:
-        cached_data, cached_time = _cache[cache_key]
-        if time.time() - cached_time < _cache_duration:
-            return cached_data
+    cached = _get_cached(cache_key)
+    if cached is not None:
+        return cached
+
+    return _fetches.do(cache_key, lambda: _fetch_stock_quote(ticker, cache_key))
+
 
+def _fetch_stock_quote(ticker: str, cache_key: str) -> Dict:
     try:
         params = {
             'function': 'GLOBAL_QUOTE',
@@ -47,6 +79,9 @@ def get_stock_quote(ticker: str) -> Dict:
             'apikey': ALPHA_VANTAGE_API_KEY
         }
 
+        if not rate_limiter.acquire_blocking("alpha_vantage", max_wait=MAX_RATE_LIMIT_WAIT):
+            print(f"[INFO] Alpha Vantage rate limit reached, using fallback data for {ticker}")
+            return _get_mock_quote(ticker)
         response = requests.get(BASE_URL, params=params, timeout=10)
         response.raise_for_status()
         data = response.json()
@@ -67,7 +102,7 @@ def get_stock_quote(ticker: str) -> Dict:
         }
 
         # Cache the result
-        _cache[cache_key] = (result, time.time())
+        _set_cache(cache_key, result)
 
         return result
 
@@ -93,11 +128,14 @@ def get_historical_returns(ticker: str) -> Dict:
     cache_key = f"returns_{ticker}"
 
     # Check cache
-    if cache_key in _cache:
-        cached_data, cached_time = _cache[cache_key]
-        if time.time() - cached_time < _cache_duration:
-            return cached_data
+    cached = _get_cached(cache_key)
+    if cached is not None:
+        return cached
+
+    return _fetches.do(cache_key, lambda: _fetch_historical_returns(ticker, cache_key))
 
+
+def _fetch_historical_returns(ticker: str, cache_key: str) -> Dict:
     try:
         params = {
             'function': 'TIME_SERIES_MONTHLY',
@@ -105,6 +143,9 @@ def get_historical_returns(ticker: str) -> Dict:
             'apikey': ALPHA_VANTAGE_API_KEY
         }
 
+        if not rate_limiter.acquire_blocking("alpha_vantage", max_wait=MAX_RATE_LIMIT_WAIT):
+            print(f"[INFO] Alpha Vantage rate limit reached, using fallback data for {ticker}")
+            return _get_mock_returns(ticker)
         response = requests.get(BASE_URL, params=params, timeout=10)
         response.raise_for_status()
         data = response.json()
@@ -149,7 +190,7 @@ def get_historical_returns(ticker: str) -> Dict:
         }
 
         # Cache the result
-        _cache[cache_key] = (result, time.time())
+        _set_cache(cache_key, result)
 
         return result
 
@@ -222,11 +263,10 @@ def get_multiple_etf_data(tickers: list) -> Dict[str, Dict]:
     Batch fetch data for multiple ETFs.
     Returns dict with ticker as key.
     """
+    # API rate limits are enforced per call by rate_limiter, so cached tickers don't wait
     result = {}
     for ticker in tickers:
         result[ticker] = get_etf_details(ticker)
-        # Respect API rate limits (5 calls/minute for free tier)
-        time.sleep(0.5)
 
     return result
 
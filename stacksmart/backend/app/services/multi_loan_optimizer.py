@@ -54,12 +54,7 @@ def calculate_multi_loan_optimization(
 
     # Core decision logic - ONLY based on interest rates vs market return
     # NOT affected by timeline
-    if highest_rate > market_return:
-        recommendation = "pay_debts"
-        confidence_gap = highest_rate - market_return
-    else:
-        recommendation = "invest"
-        confidence_gap = market_return - highest_rate
+    recommendation, confidence_gap = recommend_debt_or_invest(highest_rate, market_return)
 
     # Calculate confidence score (0-1 scale)
     # Higher gap = higher confidence
@@ -175,6 +170,18 @@ def calculate_multi_loan_optimization(
     )
 
 
+def recommend_debt_or_invest(highest_rate: float, market_return: float) -> Tuple[str, float]:
+    """
+    Pay debts when the highest rate beats the expected market return, otherwise invest.
+
+    Returns:
+        ("pay_debts" or "invest", gap between the two rates)
+    """
+    if highest_rate > market_return:
+        return "pay_debts", highest_rate - market_return
+    return "invest", market_return - highest_rate
+
+
 def calculate_debt_path_projection(
     loans: List[LoanData],
     monthly_budget: float,
@@ -0,0 +1,130 @@
+"""
+Net Worth Projection Engine
+
+Projects net worth month by month from the real Plaid picture:
+- Every student loan and credit card accrues interest at its own rate and
+  receives its minimum payment (paid from income, as in multi_loan_optimizer)
+- Action plan payments reduce the named debts up front (capped at the balance)
+- Existing holdings and new investments grow at the plan's expected return
+
+Scenarios (e.g. one action plan per risk tolerance) are stacked into arrays and
+projected together, so comparing plans costs one batched computation.
+"""
+
+from typing import Dict, List, Tuple
+import numpy as np
+from app.services.optimization_engine import project_loan_balances, project_investment_values
+
+DEFAULT_PROJECTION_MONTHS = 60  # 5 years
+
+
+def extract_debts(financial_data: Dict) -> List[Dict]:
+    """
+    Flatten liabilities into one list with rates as decimals.
+
+    Each debt keeps the (type, account) key that action plans use to refer to it.
+    """
+    liabilities = financial_data.get('liabilities', {})
+    debts = []
+
+    for card in liabilities.get('credit_cards', []):
+        debts.append({
+            'type': 'credit_card',
+            'account': card.get('name'),
+            'balance': float(card.get('balance', 0)),
+            'rate': float(card.get('apr', 0)) / 100,
+            'minimum_payment': float(card.get('minimum_payment', 0))
+        })
+
+    for loan in liabilities.get('student_loans', []):
+        debts.append({
+            'type': 'student_loan',
+            'account': loan.get('loan_name', 'Student Loan'),
+            'balance': float(loan.get('balance', 0)),
+            'rate': float(loan.get('interest_rate', 0)) / 100,
+            'minimum_payment': float(loan.get('minimum_payment', 0))
+        })
+
+    return debts
+
+
+def _apply_actions(debts: List[Dict], actions: List[Dict]) -> Tuple[np.ndarray, float]:
+    """Up-front debt payments (per debt) and new investment for one action list"""
+    payments = np.zeros(len(debts))
+    invested = 0.0
+
+    for action in actions:
+        if action['action'] == 'invest':
+            invested += action['amount']
+        elif action['action'] == 'pay_debt':
+            for i, debt in enumerate(debts):
+                if debt['type'] == action.get('type') and debt['account'] == action.get('account') \
+                        and payments[i] < debt['balance']:
+                    # Never pay (and take from cash) more than is still owed
+                    payments[i] += min(action['amount'], debt['balance'] - payments[i])
+                    break
+
+    return payments, invested
+
+
+def project_scenarios(
+    financial_data: Dict,
+    scenarios: List[Dict],
+    months: int = DEFAULT_PROJECTION_MONTHS
+) -> List[Dict]:
+    """
+    Project net worth for several action plans in one batched computation.
+
+    Args:
+        financial_data: Complete financial picture from plaid_service
+        scenarios: Each has 'actions' (action plan list) and 'annual_return' (decimal)
+        months: Projection length
+
+    Returns:
+        One dict per scenario with the monthly net worth curve (month 0 = today),
+        1yr/5yr values and remaining debt
+    """
+    debts = extract_debts(financial_data)
+    investments = financial_data.get('investments', {})
+    holdings_value = float(investments.get('total_taxable_value', 0)) + float(investments.get('total_retirement_value', 0))
+    cash = float(financial_data['bank_accounts']['total_balance'])
+
+    applied = [_apply_actions(debts, s['actions']) for s in scenarios]
+    upfront = np.array([a[0] for a in applied]).reshape(len(scenarios), len(debts))
+    invested = np.array([a[1] for a in applied])
+    annual_return = np.array([s['annual_return'] for s in scenarios])
+
+    balances = np.array([d['balance'] for d in debts])
+    rates = np.array([d['rate'] for d in debts])
+    minimums = np.array([d['minimum_payment'] for d in debts])
+
+    # Debts: (scenarios, debts, months)
+    start_balances = np.maximum(0, balances[None, :] - upfront)
+    debt_paths = project_loan_balances(
+        start_balances,
+        rates[None, :],
+        np.broadcast_to(minimums[None, :, None], (len(scenarios), len(debts), months))
+    )
+    total_debt = debt_paths.sum(axis=1)
+
+    # Investments: (scenarios, months); existing holdings plus the plan's new investment
+    investment_paths = project_investment_values(
+        holdings_value + invested,
+        np.zeros((len(scenarios), months)),
+        annual_return
+    )
+
+    remaining_cash = cash - upfront.sum(axis=1) - invested
+    net_worth = remaining_cash[:, None] + investment_paths - total_debt
+    today = cash + holdings_value - balances.sum()
+    curves = np.hstack([np.full((len(scenarios), 1), today), net_worth])
+
+    results = []
+    for i in range(len(scenarios)):
+        results.append({
+            'monthly_net_worth': np.round(curves[i], 2).tolist(),
+            'projected_1yr': float(curves[i, min(12, months)]),
+            'projected_5yr': float(curves[i, min(60, months)]),
+            'remaining_debt_5yr': float(total_debt[i, min(60, months) - 1])
+        })
+    return results
@@ -71,6 +71,71 @@ def calculate_investment_path(
     return values
 
 
+def project_loan_balances(
+    principal: np.ndarray,
+    annual_rate: np.ndarray,
+    payments: np.ndarray
+) -> np.ndarray:
+    """
+    Vectorized calculate_loan_payoff_path for many loans or scenarios at once.
+
+    Args:
+        principal: Starting balances, any shape (...)
+        annual_rate: Annual rates as decimals, broadcastable to principal
+        payments: Total payment each month, shape (..., months)
+
+    Returns:
+        Remaining balance after each month, shape (..., months)
+    """
+    payments = np.asarray(payments, dtype=float)
+    months = payments.shape[-1]
+    shape = np.broadcast_shapes(np.shape(principal), np.shape(annual_rate), payments.shape[:-1])
+    monthly_rate = np.broadcast_to(np.asarray(annual_rate, dtype=float) / 12, shape)
+    balance = np.broadcast_to(np.asarray(principal, dtype=float), shape).copy()
+    payments = np.broadcast_to(payments, shape + (months,))
+
+    balances = np.empty(shape + (months,))
+    for month in range(months):
+        # Same rule as the scalar path: interest accrues, then the payment applies
+        interest = balance * monthly_rate
+        balance = np.where(balance > 0, np.maximum(0, balance + interest - payments[..., month]), 0)
+        balances[..., month] = balance
+
+    return balances
+
+
+def project_investment_values(
+    initial_value: np.ndarray,
+    contributions: np.ndarray,
+    annual_return: np.ndarray
+) -> np.ndarray:
+    """
+    Vectorized calculate_investment_path with a starting balance and a
+    contribution schedule.
+
+    Args:
+        initial_value: Starting balances, any shape (...)
+        contributions: Contribution at the start of each month, shape (..., months)
+        annual_return: Annual returns as decimals, broadcastable to initial_value
+
+    Returns:
+        Value at the end of each month, shape (..., months)
+    """
+    contributions = np.asarray(contributions, dtype=float)
+    months = contributions.shape[-1]
+    shape = np.broadcast_shapes(np.shape(initial_value), np.shape(annual_return), contributions.shape[:-1])
+    growth = np.broadcast_to(1 + np.asarray(annual_return, dtype=float) / 12, shape)
+    value = np.broadcast_to(np.asarray(initial_value, dtype=float), shape).copy()
+    contributions = np.broadcast_to(contributions, shape + (months,))
+
+    values = np.empty(shape + (months,))
+    for month in range(months):
+        value = (value + contributions[..., month]) * growth
+        values[..., month] = value
+
+    return values
+
+
 def calculate_net_worth(
     investment_value: float,
     loan_balance: float
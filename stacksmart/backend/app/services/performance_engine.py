@@ -0,0 +1,275 @@
+"""
+Investment Performance Engine
+
+Computes the user's actual performance per account and for the whole portfolio
+from Plaid investment transactions and current holdings:
+- Time-weighted return (TWR): the investments' performance, independent of
+  when money was added or withdrawn
+- Money-weighted return (XIRR): the annual rate the user actually earned on
+  their deposits, timing included
+
+Plaid only gives today's holdings, so account values on earlier dates are
+rebuilt by rolling each position back through its transactions and pricing it
+from the nearest transaction prices (linear between observations, ending at
+today's price). Accounts that report no cash deposits or withdrawals are
+treated as trade-only: every buy is new money and every sale is money out.
+
+All accounts share one valuation grid (the window start plus every cash flow
+date) and one batched XIRR solve, so long histories cost a few array passes.
+"""
+
+from datetime import date, datetime
+from typing import Dict, Optional
+import numpy as np
+
+DAYS_PER_YEAR = 365.0
+CASH_KEY = "CASH"
+
+# Transactions that move money into or out of the account (Plaid subtypes)
+EXTERNAL_CASH_SUBTYPES = {"deposit", "withdrawal", "contribution", "distribution", "transfer"}
+
+XIRR_MIN_RATE = -0.99
+XIRR_MAX_RATE = 100.0
+XIRR_ITERATIONS = 100
+XIRR_TOLERANCE = 1e-10
+
+
+def to_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.fromisoformat(str(value)[:10]).date()
+
+
+def _is_external_flow(txn: Dict) -> bool:
+    return txn['type'] == 'transfer' or (txn['type'] == 'cash' and txn.get('subtype') in EXTERNAL_CASH_SUBTYPES)
+
+
+def security_key(item: Dict) -> Optional[str]:
+    return item.get('ticker') or item.get('name')
+
+
+def solve_xirr(groups: np.ndarray, years: np.ndarray, amounts: np.ndarray, num_groups: int) -> np.ndarray:
+    """
+    Annual rate r per group with sum(amount * (1 + r) ** -years) = 0.
+
+    Every group is solved at once: safeguarded Newton on x = ln(1 + r), falling
+    back to bisection whenever a step leaves the bracket. Each iteration is a
+    pair of bincounts over the flat cash flow arrays.
+
+    Returns:
+        Rate per group (NaN where the flows never change sign)
+    """
+    def npv(x):
+        discounted = amounts * np.exp(-x[groups] * years)
+        value = np.bincount(groups, weights=discounted, minlength=num_groups)
+        slope = np.bincount(groups, weights=-years * discounted, minlength=num_groups)
+        return value, slope
+
+    lo = np.full(num_groups, np.log1p(XIRR_MIN_RATE))
+    hi = np.full(num_groups, np.log1p(XIRR_MAX_RATE))
+    f_lo, _ = npv(lo)
+    f_hi, _ = npv(hi)
+    solvable = np.sign(f_lo) * np.sign(f_hi) < 0
+
+    x = np.zeros(num_groups)
+    for _ in range(XIRR_ITERATIONS):
+        f, slope = npv(x)
+        # Keep the root bracketed: move the end whose sign matches f
+        same_as_lo = np.sign(f) == np.sign(f_lo)
+        lo = np.where(same_as_lo, x, lo)
+        hi = np.where(same_as_lo, hi, x)
+
+        step = np.divide(f, slope, out=np.zeros(num_groups), where=slope != 0)
+        candidate = x - step
+        outside = (slope == 0) | (candidate <= lo) | (candidate >= hi)
+        candidate = np.where(outside, (lo + hi) / 2, candidate)
+
+        converged = np.abs(candidate - x) < XIRR_TOLERANCE
+        x = candidate
+        if converged[solvable].all():
+            break
+
+    return np.where(solvable, np.expm1(x), np.nan)
+
+
+def calculate_performance(
+    holdings: Dict,
+    transactions: Dict,
+    start_date: datetime,
+    end_date: datetime
+) -> Dict:
+    """
+    TWR and XIRR per account and for the whole portfolio over a window.
+
+    Args:
+        holdings: plaid_service.get_investment_holdings() result
+        transactions: plaid_service.get_investment_transactions() for the window
+        start_date: Window start
+        end_date: Window end (today - current holdings are valued here)
+
+    Returns:
+        Per-account and portfolio start/end value, net contributions,
+        TWR (cumulative and annualized) and XIRR, all in percent
+    """
+    start, end = to_date(start_date), to_date(end_date)
+    horizon = max((end - start).days, 1)
+    holdings_list = holdings.get('holdings', [])
+    txn_list = [
+        t for t in transactions.get('transactions', [])
+        if t['type'] != 'cancel' and start <= to_date(t['date']) <= end
+    ]
+
+    # Accounts
+    account_names = {a['account_id']: a.get('name') for a in holdings.get('accounts', [])}
+    account_ids = list(dict.fromkeys(
+        list(account_names) + [h['account_id'] for h in holdings_list] + [t['account_id'] for t in txn_list]
+    ))
+    account_index = {a: i for i, a in enumerate(account_ids)}
+    num_accounts = len(account_ids)
+    tracks_cash = np.zeros(num_accounts, dtype=bool)
+    for t in txn_list:
+        if _is_external_flow(t):
+            tracks_cash[account_index[t['account_id']]] = True
+
+    txn_days = np.array([(to_date(t['date']) - start).days for t in txn_list], dtype=int)
+    txn_accounts = np.array([account_index[t['account_id']] for t in txn_list], dtype=int)
+
+    # External cash flows into each account (positive = money added)
+    flow_amounts = np.zeros(len(txn_list))
+    for i, t in enumerate(txn_list):
+        if tracks_cash[txn_accounts[i]]:
+            if _is_external_flow(t):
+                in_kind = t.get('quantity') and t.get('price') and security_key(t)
+                flow_amounts[i] = t['quantity'] * t['price'] if in_kind else -t['amount']
+        elif t['type'] == 'buy':
+            flow_amounts[i] = abs(t['amount'])
+        elif t['type'] == 'sell':
+            flow_amounts[i] = -abs(t['amount'])
+    is_flow = flow_amounts != 0
+
+    # Valuation grid: window start plus every flow date (values taken before that day's activity)
+    grid = np.union1d([0], txn_days[is_flow])
+    num_points = len(grid)
+
+    # Positions: one row per (account, security); cash is a security priced at $1
+    pairs = {}
+    current_qty = []
+
+    def pair_row(account: int, key: str) -> int:
+        if (account, key) not in pairs:
+            pairs[(account, key)] = len(pairs)
+            current_qty.append(0.0)
+        return pairs[(account, key)]
+
+    end_values = np.zeros(num_accounts)
+    observed = {}  # security -> list of (day, price)
+    for h in holdings_list:
+        account = account_index[h['account_id']]
+        key = CASH_KEY if h.get('type') == 'cash' else security_key(h)
+        if key is None:
+            continue
+        current_qty[pair_row(account, key)] += h['value'] if key == CASH_KEY else h['quantity']
+        end_values[account] += h['value']
+        if key != CASH_KEY and h.get('price'):
+            observed.setdefault(key, []).append((horizon, h['price']))
+
+    delta_rows, delta_days, delta_qty = [], [], []
+    for i, t in enumerate(txn_list):
+        account = txn_accounts[i]
+        key = security_key(t)
+        quantity = t.get('quantity') or 0.0
+        if key is not None and quantity:
+            change = abs(quantity) if t['type'] == 'buy' else -abs(quantity) if t['type'] == 'sell' else quantity
+            delta_rows.append(pair_row(account, key))
+            delta_days.append(txn_days[i])
+            delta_qty.append(change)
+        if key is not None and t.get('price'):
+            observed.setdefault(key, []).append((txn_days[i], t['price']))
+        if tracks_cash[account] and t['amount']:
+            delta_rows.append(pair_row(account, CASH_KEY))
+            delta_days.append(txn_days[i])
+            delta_qty.append(-t['amount'])  # Plaid: positive amount = cash leaving the account
+
+    num_pairs = len(pairs)
+    pair_accounts = np.array([a for a, _ in pairs], dtype=int)
+    pair_keys = [k for _, k in pairs]
+
+    # Quantity at each grid point = today's quantity minus every change on or after that day
+    changes = np.zeros((num_pairs, num_points))
+    if delta_rows:
+        buckets = np.searchsorted(grid, np.array(delta_days), side="right") - 1
+        np.add.at(changes, (np.array(delta_rows), buckets), np.array(delta_qty))
+    later_changes = np.cumsum(changes[:, ::-1], axis=1)[:, ::-1]
+    quantities = np.array(current_qty)[:, None] - later_changes
+
+    # Prices at each grid point, interpolated between observations
+    prices = np.ones((num_pairs, num_points))
+    for key in set(pair_keys) - {CASH_KEY}:
+        rows = [i for i, k in enumerate(pair_keys) if k == key]
+        points = sorted(observed.get(key, []))
+        if points:
+            days, values = zip(*points)
+            prices[rows] = np.interp(grid, days, values)
+        else:
+            prices[rows] = 0.0
+
+    values = np.zeros((num_accounts, num_points))
+    np.add.at(values, pair_accounts, quantities * prices)
+    values = np.maximum(values, 0.0)
+
+    flows = np.zeros((num_accounts, num_points))
+    np.add.at(flows, (txn_accounts[is_flow], np.searchsorted(grid, txn_days[is_flow])), flow_amounts[is_flow])
+
+    # Portfolio is one more row: the sum of every account
+    values = np.vstack([values, values.sum(axis=0)])
+    flows = np.vstack([flows, flows.sum(axis=0)])
+    end_values = np.append(end_values, end_values.sum())
+    num_groups = num_accounts + 1
+
+    # TWR: chain each period's growth; a period starts after that day's flow
+    period_start = values + flows
+    period_end = np.hstack([values[:, 1:], end_values[:, None]])
+    valid = period_start > 0
+    growth = np.where(valid, period_end / np.where(valid, period_start, 1.0), 1.0)
+    twr = np.prod(growth, axis=1) - 1
+    has_value = valid.any(axis=1)
+    twr_annualized = (1 + twr) ** (DAYS_PER_YEAR / horizon) - 1
+
+    # XIRR: the investor pays in the start value and every flow, and receives today's value
+    paid_in = -flows
+    paid_in[:, 0] -= values[:, 0]
+    amounts = np.hstack([paid_in, end_values[:, None]]).ravel()
+    groups = np.repeat(np.arange(num_groups), num_points + 1)
+    years = np.tile(np.append(grid, horizon) / DAYS_PER_YEAR, num_groups)
+    xirr = solve_xirr(groups, years, amounts, num_groups)
+
+    def summarize(i: int) -> Dict:
+        return {
+            'start_value': round(float(values[i, 0]), 2),
+            'end_value': round(float(end_values[i]), 2),
+            'net_contributions': round(float(flows[i].sum()), 2),
+            'time_weighted_return': round(float(twr[i]) * 100, 2) if has_value[i] else None,
+            'time_weighted_return_annualized': round(float(twr_annualized[i]) * 100, 2) if has_value[i] else None,
+            'money_weighted_return': round(float(xirr[i]) * 100, 2) if np.isfinite(xirr[i]) else None,
+        }
+
+    accounts = []
+    for account_id, i in account_index.items():
+        accounts.append({
+            'account_id': account_id,
+            'name': account_names.get(account_id),
+            'flow_source': 'cash_transfers' if tracks_cash[i] else 'trades',
+            'cash_flow_count': int(np.count_nonzero(is_flow & (txn_accounts == i))),
+            **summarize(i)
+        })
+
+    return {
+        'start_date': start.isoformat(),
+        'end_date': end.isoformat(),
+        'period_days': horizon,
+        'transactions_analyzed': len(txn_list),
+        'portfolio': summarize(num_accounts),
+        'accounts': accounts
+    }
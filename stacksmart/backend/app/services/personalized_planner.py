@@ -10,8 +10,12 @@ Creates customized investment portfolios based on:
 Uses real market data to show actual ETF performance and build realistic portfolios.
 """
 
-from typing import List, Dict, Optional
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
 import math
+import threading
+import numpy as np
 from app.models.schemas import (
     PersonalizedPlanRequest,
     PersonalizedPlanResult,
@@ -19,7 +23,7 @@ from app.models.schemas import (
     RiskTolerance,
     FinancialGoal
 )
-from app.services import market_data_fetcher
+from app.services import market_data_fetcher, market_calendar, portfolio_optimizer, account_projector
 
 
 # Portfolio templates based on risk tolerance
@@ -97,8 +101,43 @@ GOAL_ADJUSTMENTS = {
 }
 
 
+# Every ETF the planner can recommend (efficient frontier universe)
+PLANNER_UNIVERSE = sorted(
+    {t for template in PORTFOLIO_TEMPLATES.values() for t in template["allocation"]}
+    | {t for goal in GOAL_ADJUSTMENTS.values() for t in goal["adjustments"]}
+)
+
+# Position on the efficient frontier (1-10 risk score) for each risk tolerance,
+# using the same buckets as investment_planner (1-3, 4-6, 7-10)
+FRONTIER_RISK_SCORES = {
+    RiskTolerance.CONSERVATIVE: 2.5,
+    RiskTolerance.MODERATE: 5.5,
+    RiskTolerance.AGGRESSIVE: 8.5
+}
+
+# Goals that call for less risk move down the frontier
+FRONTIER_GOAL_SHIFTS = {
+    FinancialGoal.WEALTH_BUILDING: 0.0,
+    FinancialGoal.INCOME_GENERATION: -1.0,
+    FinancialGoal.CAPITAL_PRESERVATION: -2.5,
+    FinancialGoal.DEBT_FREEDOM: -1.5
+}
+
+MIN_FRONTIER_WEIGHT = 1.0  # Drop frontier positions below 1% of the portfolio
+
+# Glide path: start shifting stocks into bonds this many years before the horizon,
+# ending with this fraction of the original stock allocation
+GLIDE_PATH_START_YEARS = 10
+GLIDE_PATH_END_EQUITY_FRACTION = 0.4
+
 ROTH_IRA_ANNUAL_LIMIT = 7000.0  # 2025 contribution limit
 
+# Plan cache: (canonical request, market data version) -> (plan, timestamp).
+# Entries also expire with the price cache, so a stale plan never hides a price refresh.
+PLAN_CACHE_MAX_ENTRIES = 512
+_plan_cache: "OrderedDict[Tuple[str, int], Tuple[PersonalizedPlanResult, datetime]]" = OrderedDict()
+_plan_cache_lock = threading.Lock()
+
 
 def calculate_paycheck_allocation(request: PersonalizedPlanRequest) -> Optional[Dict]:
     """
@@ -159,16 +198,68 @@ def calculate_paycheck_allocation(request: PersonalizedPlanRequest) -> Optional[
     }
 
 
+def get_template_allocation(risk_tolerance: RiskTolerance, financial_goal: FinancialGoal) -> Dict[str, float]:
+    """
+    Template allocation for a risk tolerance with goal-based adjustments applied.
+
+    Returns ticker -> percentage, normalized to 100%. Tickers the goal reduced to 0%
+    are kept; callers filter on pct > 0.
+    """
+    allocation = PORTFOLIO_TEMPLATES[risk_tolerance]["allocation"].copy()
+
+    # Apply goal-based adjustments
+    for ticker, adjustment in GOAL_ADJUSTMENTS[financial_goal]["adjustments"].items():
+        if ticker in allocation:
+            allocation[ticker] = allocation[ticker] + adjustment
+        else:
+            allocation[ticker] = adjustment
+
+    # Normalize to 100%
+    total = sum(allocation.values())
+    return {k: (v / total) * 100 for k, v in allocation.items()}
+
+
 def generate_personalized_plan(request: PersonalizedPlanRequest) -> PersonalizedPlanResult:
     """
     Generate a personalized investment plan based on user's profile.
 
+    Plans are cached by request and market data version: a repeat request
+    is served from cache until prices are refreshed.
+
     Args:
         request: User's financial situation and preferences
 
     Returns:
         Detailed investment plan with real ETF data and projections
     """
+    key = (request.model_dump_json(), market_data_fetcher.get_market_data_version())
+    ttl_seconds = market_data_fetcher.CACHE_TTL_MINUTES * 60
+
+    with _plan_cache_lock:
+        entry = _plan_cache.get(key)
+        if entry is not None and market_calendar.is_fresh(entry[1].timestamp(), ttl_seconds):
+            _plan_cache.move_to_end(key)
+            print(f"[CACHE] Using cached plan (market data v{key[1]})")
+            return entry[0].model_copy(deep=True)
+
+    plan = _build_personalized_plan(request)
+
+    # Building the plan may have refreshed prices; store under the version it was built from
+    key = (key[0], market_data_fetcher.get_market_data_version())
+    with _plan_cache_lock:
+        if _plan_cache and next(reversed(_plan_cache))[1] != key[1]:
+            # Prices changed: every older entry is stale
+            for stale in [k for k in _plan_cache if k[1] != key[1]]:
+                del _plan_cache[stale]
+        _plan_cache[key] = (plan, datetime.now())
+        while len(_plan_cache) > PLAN_CACHE_MAX_ENTRIES:
+            _plan_cache.popitem(last=False)
+
+    return plan.model_copy(deep=True)
+
+
+def _build_personalized_plan(request: PersonalizedPlanRequest) -> PersonalizedPlanResult:
+    """Build a plan from scratch (generate_personalized_plan adds caching)"""
     print(f"[DEBUG] Generating personalized plan: ${request.monthly_investment_amount}/mo, {request.risk_tolerance.value} risk, {request.financial_goal.value} goal")
 
     # Paycheck allocation waterfall (optional — only runs when monthly_gross_income is set)
@@ -184,20 +275,32 @@ def generate_personalized_plan(request: PersonalizedPlanRequest) -> Personalized
 
     # Get base portfolio template
     template = PORTFOLIO_TEMPLATES[request.risk_tolerance]
-    allocation = template["allocation"].copy()
-
-    # Apply goal-based adjustments
     goal_config = GOAL_ADJUSTMENTS[request.financial_goal]
-    for ticker, adjustment in goal_config["adjustments"].items():
-        if ticker in allocation:
-            allocation[ticker] = allocation[ticker] + adjustment
-        else:
-            allocation[ticker] = adjustment
+    frontier_point = None
+
+    if request.use_efficient_frontier:
+        # Optimal mix for this risk level from the cached efficient frontier
+        risk_score = min(10.0, max(1.0, FRONTIER_RISK_SCORES[request.risk_tolerance] + FRONTIER_GOAL_SHIFTS[request.financial_goal]))
+        frontier_point = portfolio_optimizer.lookup_frontier_allocation(PLANNER_UNIVERSE, risk_score)
+        allocation = {
+            ticker: weight * 100
+            for ticker, weight in frontier_point["weights"].items()
+            if weight * 100 >= MIN_FRONTIER_WEIGHT
+        }
+    else:
+        allocation = get_template_allocation(request.risk_tolerance, request.financial_goal)
 
     # Normalize to 100%
     total = sum(allocation.values())
     allocation = {k: (v / total) * 100 for k, v in allocation.items()}
 
+    # Glide path: today's allocation is the first year of the path
+    glide_tickers, glide_matrix = None, None
+    base_allocation = allocation
+    if request.use_glide_path:
+        glide_tickers, glide_matrix = calculate_glide_path_allocations(allocation, request.time_horizon_years)
+        allocation = {t: float(pct) for t, pct in zip(glide_tickers, glide_matrix[0]) if pct > 0}
+
     # Get list of tickers with positive allocation
     active_tickers = [t for t, pct in allocation.items() if pct > 0]
 
@@ -238,26 +341,74 @@ def generate_personalized_plan(request: PersonalizedPlanRequest) -> Personalized
         total_expense_ratio += (percentage / 100) * etf_data["expense_ratio"]
 
     # Calculate projections
-    expected_return = template["expected_return"]
+    if frontier_point is not None:
+        # Goal is already reflected in the frontier position
+        expected_return = frontier_point["expected_return"]
+    else:
+        expected_return = template["expected_return"]
 
-    # Adjust expected return based on goal
-    if request.financial_goal == FinancialGoal.CAPITAL_PRESERVATION:
-        expected_return *= 0.7  # Lower return expectation
-    elif request.financial_goal == FinancialGoal.INCOME_GENERATION:
-        expected_return *= 0.85
+        # Adjust expected return based on goal
+        if request.financial_goal == FinancialGoal.CAPITAL_PRESERVATION:
+            expected_return *= 0.7  # Lower return expectation
+        elif request.financial_goal == FinancialGoal.INCOME_GENERATION:
+            expected_return *= 0.85
 
     current_value = request.current_savings
 
-    # Future value calculations (compound interest with monthly contributions)
-    # Uses brokerage amount only — 401k/Roth projections are separate account growth
-    projected_1yr = calculate_future_value(current_value, effective_monthly, expected_return, 1)
-    projected_5yr = calculate_future_value(current_value, effective_monthly, expected_return, 5)
-    projected_10yr = calculate_future_value(current_value, effective_monthly, expected_return, 10)
-    projected_20yr = calculate_future_value(current_value, effective_monthly, expected_return, 20)
-    projected_30yr = calculate_future_value(current_value, effective_monthly, expected_return, 30)
+    glide_path = None
+    if glide_matrix is not None:
+        # Past the horizon the portfolio stays at the final glide path mix
+        horizon = len(glide_matrix)
+        extended = np.vstack([glide_matrix, np.repeat(glide_matrix[-1:], max(0, 30 - horizon), axis=0)])
+        full_path = project_glide_path(
+            glide_tickers, extended, base_allocation, expected_return, current_value, effective_monthly
+        )
+        glide_path = {
+            key: value if key == "tickers" else value[:horizon]
+            for key, value in full_path.items()
+        }
+
+        # Headline projections follow the de-risking path; report its blended (geometric mean) return
+        values = full_path["projected_value"]
+        projected_1yr, projected_5yr, projected_10yr, projected_20yr, projected_30yr = (
+            values[year - 1] for year in (1, 5, 10, 20, 30)
+        )
+        yearly_returns = np.array(glide_path["expected_return"]) / 100
+        expected_return = float(np.prod(1 + yearly_returns) ** (1 / horizon) - 1)
+    else:
+        # Future value calculations (compound interest with monthly contributions)
+        # Uses brokerage amount only — 401k/Roth projections are separate account growth
+        projected_1yr = calculate_future_value(current_value, effective_monthly, expected_return, 1)
+        projected_5yr = calculate_future_value(current_value, effective_monthly, expected_return, 5)
+        projected_10yr = calculate_future_value(current_value, effective_monthly, expected_return, 10)
+        projected_20yr = calculate_future_value(current_value, effective_monthly, expected_return, 20)
+        projected_30yr = calculate_future_value(current_value, effective_monthly, expected_return, 30)
+
+    # Every paycheck account with its own tax treatment (401k, Roth IRA, brokerage)
+    account_projections = None
+    if paycheck_breakdown is not None:
+        account_projections = account_projector.project_accounts(
+            paycheck_breakdown,
+            current_value,
+            expected_return,
+            account_projector.portfolio_dividend_yield(allocation),
+            retirement_tax_rate=request.retirement_tax_rate,
+            capital_gains_tax_rate=request.capital_gains_tax_rate
+        )
 
     # Generate reasoning
     reasoning = generate_reasoning(request, template, goal_config, expected_return)
+    if frontier_point is not None:
+        reasoning.append(
+            f"Allocation taken from the mean-variance efficient frontier: the highest expected return "
+            f"for ~{frontier_point['volatility'] * 100:.1f}% annual volatility (risk score {frontier_point['risk_score']:.1f}/10)."
+        )
+    if glide_path is not None:
+        final_bonds = glide_path["bond_percentage"][-1]
+        reasoning.append(
+            f"Glide path: bonds grow to {final_bonds:.0f}% of the portfolio by year {request.time_horizon_years} "
+            f"to protect what you've built as your deadline approaches."
+        )
 
     # Generate next steps
     next_steps = generate_next_steps(request, etf_allocations, paycheck_breakdown)
@@ -290,6 +441,8 @@ def generate_personalized_plan(request: PersonalizedPlanRequest) -> Personalized
         warnings=warnings,
         paycheck_breakdown=paycheck_breakdown,
         months_to_emergency_fund=months_to_emergency_fund,
+        glide_path=glide_path,
+        account_projections=account_projections,
     )
 
     print(f"[DEBUG] Plan generated: {template['name']}, {len(etf_allocations)} ETFs, {expected_return * 100:.1f}% expected return")
@@ -317,6 +470,84 @@ def calculate_future_value(current: float, monthly: float, annual_return: float,
     return fv_current + fv_contributions
 
 
+def calculate_glide_path_allocations(allocation: Dict[str, float], years: int) -> Tuple[List[str], np.ndarray]:
+    """
+    Year-by-year allocation that shifts stocks into bonds as the horizon approaches.
+
+    Stocks stay at their starting weight until GLIDE_PATH_START_YEARS before the
+    horizon, then shrink linearly to GLIDE_PATH_END_EQUITY_FRACTION of it in the
+    final year. Freed-up weight goes to the bond funds in proportion to their
+    starting weights (BND if the portfolio holds no bonds).
+
+    Returns:
+        (tickers, matrix) where matrix has shape (years, len(tickers)) in percent
+    """
+    tickers = [t for t, pct in allocation.items() if pct > 0]
+    if not any(t in portfolio_optimizer.BOND_TICKERS for t in tickers):
+        tickers.append("BND")
+    weights = np.array([allocation.get(t, 0.0) for t in tickers]) / 100
+    is_bond = np.array([t in portfolio_optimizer.BOND_TICKERS for t in tickers])
+
+    equity = np.where(is_bond, 0.0, weights)
+    bonds = np.where(is_bond, weights, 0.0)
+    bond_mix = bonds / bonds.sum() if bonds.sum() > 0 else is_bond / is_bond.sum()
+
+    # Years remaining at the start of each year: years, years-1, ..., 1
+    years_left = np.arange(years, 0, -1)
+    progress = np.clip((GLIDE_PATH_START_YEARS - years_left + 1) / GLIDE_PATH_START_YEARS, 0.0, 1.0)
+    equity_scale = 1 - (1 - GLIDE_PATH_END_EQUITY_FRACTION) * progress
+
+    equity_matrix = np.outer(equity_scale, equity)
+    bond_matrix = np.outer(1 - equity_matrix.sum(axis=1), bond_mix)
+    return tickers, (equity_matrix + bond_matrix) * 100
+
+
+def project_glide_path(
+    tickers: List[str],
+    matrix: np.ndarray,
+    base_allocation: Dict[str, float],
+    base_return: float,
+    current: float,
+    monthly: float
+) -> Dict:
+    """
+    Project portfolio value along a glide path.
+
+    Per-ETF returns come from long-run assumptions, scaled so the base allocation
+    earns the plan's expected return. Each year compounds monthly at that year's
+    rate; the yearly recurrence V_y = a_y * V_(y-1) + b_y is solved in closed form
+    with cumulative products, so the whole path is a single vectorized evaluation.
+
+    Returns a column-oriented dict ready for charting.
+    """
+    long_run = np.array([
+        portfolio_optimizer.LONG_RUN_ASSUMPTIONS.get(t, portfolio_optimizer.DEFAULT_ASSUMPTION)[0]
+        for t in tickers
+    ])
+    base_weights = np.array([base_allocation.get(t, 0.0) for t in tickers]) / 100
+    base_long_run = base_weights @ long_run
+    ticker_returns = long_run * (base_return / base_long_run if base_long_run > 0 else 1.0)
+
+    annual_returns = (matrix / 100) @ ticker_returns
+    monthly_rates = annual_returns / 12
+    growth = (1 + monthly_rates) ** 12
+    safe_rates = np.where(monthly_rates == 0, 1.0, monthly_rates)
+    contributions = np.where(monthly_rates == 0, monthly * 12, monthly * (growth - 1) / safe_rates)
+
+    cumulative_growth = np.cumprod(growth)
+    values = cumulative_growth * (current + np.cumsum(contributions / cumulative_growth))
+
+    is_bond = np.array([t in portfolio_optimizer.BOND_TICKERS for t in tickers])
+    return {
+        "tickers": tickers,
+        "years": list(range(1, len(matrix) + 1)),
+        "allocation": np.round(matrix, 1).tolist(),
+        "bond_percentage": np.round(matrix[:, is_bond].sum(axis=1), 1).tolist(),
+        "expected_return": np.round(annual_returns * 100, 2).tolist(),
+        "projected_value": np.round(values, 2).tolist(),
+    }
+
+
 def get_etf_metadata(ticker: str) -> Dict:
     """
     Get ETF names, categories, and descriptions.
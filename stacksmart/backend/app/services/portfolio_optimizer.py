@@ -0,0 +1,262 @@
+"""
+Portfolio Optimizer
+
+Computes the mean-variance efficient frontier over the ETF universe used by the planner.
+- Expected returns and covariances come from cached price history
+- Every frontier point is mapped to a 1-10 risk score
+- The frontier is rebuilt only when market data refreshes, so lookups are a binary search
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.services import market_data_fetcher
+
+TRADING_DAYS_PER_YEAR = 252
+
+# Trailing one-year means are noisy, so blend them with long-run assumptions
+RETURN_SHRINKAGE = 0.5  # Weight on the long-run assumption
+
+# Risk aversion values swept to trace the frontier (high = minimum variance)
+RISK_AVERSION_GRID = np.geomspace(0.25, 400.0, 96)
+SOLVER_ITERATIONS = 1500
+
+# Long-run (expected annual return, annual volatility) per ETF.
+# Used as the shrinkage target and as a fallback when price history is unavailable.
+LONG_RUN_ASSUMPTIONS = {
+    "VOO": (0.10, 0.16),
+    "VTI": (0.10, 0.17),
+    "VXUS": (0.08, 0.17),
+    "BND": (0.04, 0.06),
+    "AGG": (0.04, 0.06),
+    "VNQ": (0.08, 0.20),
+    "QQQ": (0.12, 0.22),
+    "VWO": (0.09, 0.21),
+}
+DEFAULT_ASSUMPTION = (0.07, 0.15)
+
+BOND_TICKERS = {"BND", "AGG"}
+
+# Fallback correlations by asset class pair
+FALLBACK_CORRELATIONS = {
+    ("equity", "equity"): 0.80,
+    ("bond", "bond"): 0.90,
+    ("bond", "equity"): 0.10,
+}
+
+# Cache keyed by (sorted tickers, market data version)
+_stats_cache: Dict[Tuple, Tuple[np.ndarray, np.ndarray, str]] = {}
+_frontier_cache: Dict[Tuple, Dict] = {}
+_cache_lock = threading.Lock()
+
+
+def _asset_class(ticker: str) -> str:
+    return "bond" if ticker in BOND_TICKERS else "equity"
+
+
+def _fallback_statistics(tickers: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Build expected returns and covariance from long-run assumptions"""
+    assumptions = [LONG_RUN_ASSUMPTIONS.get(t, DEFAULT_ASSUMPTION) for t in tickers]
+    mu = np.array([a[0] for a in assumptions])
+    vol = np.array([a[1] for a in assumptions])
+
+    classes = [_asset_class(t) for t in tickers]
+    corr = np.array([
+        [1.0 if i == j else FALLBACK_CORRELATIONS[tuple(sorted((ci, cj)))]
+         for j, cj in enumerate(classes)]
+        for i, ci in enumerate(classes)
+    ])
+    return mu, corr * np.outer(vol, vol)
+
+
+def get_return_statistics(tickers: List[str]) -> Tuple[np.ndarray, np.ndarray, str]:
+    """
+    Get annualized expected returns and covariance matrix for tickers.
+
+    Computed from cached daily price history and memoized per market data version.
+
+    Returns:
+        (expected_returns, covariance, source) with rows/columns in the order of `tickers`
+    """
+    tickers = list(tickers)
+    key = (tuple(tickers), market_data_fetcher.get_market_data_version())
+    with _cache_lock:
+        if key in _stats_cache:
+            return _stats_cache[key]
+
+    history = market_data_fetcher.get_price_history(tickers)
+    fallback_mu, fallback_cov = _fallback_statistics(tickers)
+
+    if history is None or len(history) < 20 or history.isna().all().any():
+        stats = (fallback_mu, fallback_cov, "Long-run assumptions")
+    else:
+        daily = np.log(history.ffill().bfill().to_numpy(dtype=float))
+        daily_returns = np.diff(daily, axis=0)
+
+        historical_mu = daily_returns.mean(axis=0) * TRADING_DAYS_PER_YEAR
+        mu = RETURN_SHRINKAGE * fallback_mu + (1 - RETURN_SHRINKAGE) * historical_mu
+        cov = np.cov(daily_returns, rowvar=False) * TRADING_DAYS_PER_YEAR
+        stats = (mu, np.atleast_2d(cov), "Yahoo Finance")
+
+    # The version may have moved while downloading; key on the latest one
+    key = (tuple(tickers), market_data_fetcher.get_market_data_version())
+    with _cache_lock:
+        _stats_cache.clear()
+        _stats_cache[key] = stats
+    return stats
+
+
+def _project_to_simplex(v: np.ndarray) -> np.ndarray:
+    """Project each row of v onto {w : w >= 0, sum(w) = 1}"""
+    n = v.shape[1]
+    u = np.sort(v, axis=1)[:, ::-1]
+    css = np.cumsum(u, axis=1) - 1.0
+    ind = np.arange(1, n + 1)
+    cond = u - css / ind > 0
+    rho = n - 1 - np.argmax(cond[:, ::-1], axis=1)
+    theta = css[np.arange(v.shape[0]), rho] / (rho + 1)
+    return np.maximum(v - theta[:, None], 0.0)
+
+
+def _solve_frontier(mu: np.ndarray, cov: np.ndarray, risk_aversion: np.ndarray) -> np.ndarray:
+    """
+    Solve max_w  mu'w - (lambda/2) w'Cw  over long-only, fully invested portfolios
+    for every lambda at once (accelerated projected gradient).
+
+    Returns weights with shape (len(risk_aversion), len(mu)).
+    """
+    n = len(mu)
+    lipschitz = risk_aversion * max(np.linalg.eigvalsh(cov).max(), 1e-12)
+    step = (1.0 / lipschitz)[:, None]
+
+    w = np.full((len(risk_aversion), n), 1.0 / n)
+    y = w.copy()
+    t = 1.0
+    for _ in range(SOLVER_ITERATIONS):
+        grad = mu[None, :] - risk_aversion[:, None] * (y @ cov)
+        w_next = _project_to_simplex(y + step * grad)
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        y = w_next + ((t - 1) / t_next) * (w_next - w)
+        w, t = w_next, t_next
+    return w
+
+
+def get_efficient_frontier(tickers: List[str]) -> Dict:
+    """
+    Get the efficient frontier for the given tickers.
+
+    Each point carries its weights, expected return, volatility and a 1-10 risk score
+    (1 = minimum variance portfolio, 10 = maximum return portfolio). Points are sorted
+    by risk score. Rebuilt only when the market data version changes.
+    """
+    tickers = sorted(set(tickers))
+    mu, cov, source = get_return_statistics(tickers)
+    key = (tuple(tickers), market_data_fetcher.get_market_data_version())
+    with _cache_lock:
+        if key in _frontier_cache:
+            return _frontier_cache[key]
+
+    weights = _solve_frontier(mu, cov, RISK_AVERSION_GRID)
+    weights[weights < 1e-4] = 0.0
+    weights /= weights.sum(axis=1, keepdims=True)
+
+    returns = weights @ mu
+    volatility = np.sqrt(np.einsum("ij,jk,ik->i", weights, cov, weights))
+
+    # Sort by volatility and drop dominated points (numerical noise near the corners)
+    order = np.argsort(volatility)
+    weights, returns, volatility = weights[order], returns[order], volatility[order]
+    efficient = returns >= np.maximum.accumulate(returns) - 1e-9
+    weights, returns, volatility = weights[efficient], returns[efficient], volatility[efficient]
+
+    vol_range = volatility[-1] - volatility[0]
+    if vol_range > 1e-9:
+        risk_scores = 1 + 9 * (volatility - volatility[0]) / vol_range
+    else:
+        risk_scores = np.linspace(1, 10, len(volatility))
+
+    frontier = {
+        "tickers": tickers,
+        "risk_scores": risk_scores,
+        "weights": weights,
+        "expected_returns": returns,
+        "volatilities": volatility,
+        "source": source,
+        "market_data_version": key[1],
+    }
+
+    with _cache_lock:
+        _frontier_cache.clear()
+        _frontier_cache[key] = frontier
+    return frontier
+
+
+def _risk_tolerance_label(risk_score: float) -> str:
+    """Map a 1-10 risk score to the same buckets used by investment_planner"""
+    if risk_score <= 3:
+        return "conservative"
+    elif risk_score <= 6:
+        return "moderate"
+    return "aggressive"
+
+
+def _frontier_point(frontier: Dict, index: int) -> Dict:
+    risk_score = float(frontier["risk_scores"][index])
+    return {
+        "risk_score": round(risk_score, 2),
+        "risk_tolerance": _risk_tolerance_label(risk_score),
+        "expected_return": float(frontier["expected_returns"][index]),
+        "volatility": float(frontier["volatilities"][index]),
+        "weights": {
+            ticker: float(w)
+            for ticker, w in zip(frontier["tickers"], frontier["weights"][index])
+            if w > 0
+        },
+    }
+
+
+def lookup_frontier_allocation(tickers: List[str], risk_score: float) -> Dict:
+    """
+    Find the frontier portfolio closest to a 1-10 risk score.
+
+    Uses a binary search over the cached frontier, so this is O(log n) per lookup.
+
+    Returns:
+        Dict with risk_score, risk_tolerance, expected_return, volatility and
+        weights (ticker -> fraction, zero weights omitted)
+    """
+    frontier = get_efficient_frontier(tickers)
+    scores = frontier["risk_scores"]
+    idx = int(np.searchsorted(scores, risk_score))
+    if idx >= len(scores):
+        idx = len(scores) - 1
+    elif idx > 0 and risk_score - scores[idx - 1] < scores[idx] - risk_score:
+        idx -= 1
+    return _frontier_point(frontier, idx)
+
+
+def describe_frontier(tickers: List[str], max_points: Optional[int] = 25) -> Dict:
+    """
+    JSON-friendly view of the efficient frontier for the API.
+    """
+    frontier = get_efficient_frontier(tickers)
+    count = len(frontier["risk_scores"])
+    if max_points and count > max_points:
+        indices = np.unique(np.linspace(0, count - 1, max_points).round().astype(int))
+    else:
+        indices = np.arange(count)
+
+    return {
+        "tickers": frontier["tickers"],
+        "data_source": frontier["source"],
+        "market_data_version": frontier["market_data_version"],
+        "points": [
+            {
+                **point,
+                "expected_return": round(point["expected_return"] * 100, 2),
+                "volatility": round(point["volatility"] * 100, 2),
+                "weights": {t: round(w * 100, 1) for t, w in point["weights"].items()},
+            }
+            for point in (_frontier_point(frontier, int(i)) for i in indices)
+        ],
+    }
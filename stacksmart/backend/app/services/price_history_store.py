@@ -0,0 +1,163 @@
+"""
+Persistent Price History Store
+
+Daily closing prices per ticker, kept on disk so restarts and other workers
+don't re-download history. Each ticker is one .npy file of (date, close) rows,
+opened memory-mapped (read-only, zero-copy) and shared by every process on the
+host.
+
+Writers only ever append newer bars: the file is rewritten to a temp file and
+renamed over the old one, so readers never see a partial file. A file's
+modification time records when it was last checked against the provider, which
+is how market_data_fetcher decides whether a ticker needs a network call. A
+ticker the provider had no data for gets an empty file, so the miss is
+remembered like any other check.
+"""
+
+import os
+import re
+import tempfile
+import threading
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+STORE_DIR = os.getenv(
+    "PRICE_HISTORY_DIR",
+    os.path.join(tempfile.gettempdir(), "stacksmart_price_history")
+)
+
+BAR_DTYPE = np.dtype([("date", "datetime64[D]"), ("close", "float64")])
+
+# ticker -> (inode, size, mapped array); re-mapped when a writer replaces the file
+_mapped: Dict[str, Tuple[int, int, np.ndarray]] = {}
+_store_lock = threading.Lock()
+
+
+def _path(ticker: str) -> str:
+    return os.path.join(STORE_DIR, re.sub(r"[^A-Za-z0-9._-]", "_", ticker) + ".npy")
+
+
+def read(ticker: str) -> Optional[np.ndarray]:
+    """Stored bars for a ticker (read-only memmap sorted by date), or None"""
+    path = _path(ticker)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    with _store_lock:
+        entry = _mapped.get(ticker)
+        if entry is not None and entry[0] == stat.st_ino and entry[1] == stat.st_size:
+            return entry[2]
+        try:
+            bars = np.load(path, mmap_mode="r")
+        except (ValueError, OSError) as e:
+            print(f"[ERROR] Unreadable price history for {ticker}: {str(e)}")
+            return None
+        if bars.dtype != BAR_DTYPE:
+            return None
+        _mapped[ticker] = (stat.st_ino, stat.st_size, bars)
+        return bars
+
+
+def last_date(ticker: str) -> Optional[date]:
+    """Date of the newest stored bar"""
+    bars = read(ticker)
+    if bars is None or len(bars) == 0:
+        return None
+    return bars["date"][-1].astype(date)
+
+
+def checked_at(ticker: str) -> Optional[float]:
+    """Unix time the ticker was last checked against the provider, or None if never stored"""
+    try:
+        return os.path.getmtime(_path(ticker))
+    except FileNotFoundError:
+        return None
+
+
+def mark_checked(ticker: str) -> None:
+    """Record a provider check that found no new bars (an empty file if nothing is stored yet)"""
+    try:
+        os.utime(_path(ticker))
+    except FileNotFoundError:
+        _write(ticker, np.zeros(0, dtype=BAR_DTYPE))
+
+
+def _write(ticker: str, bars: np.ndarray) -> None:
+    """Write then rename so other workers never map a partial file"""
+    os.makedirs(STORE_DIR, exist_ok=True)
+    path = _path(ticker)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, bars)
+    os.replace(tmp_path, path)
+
+
+def append(ticker: str, dates: np.ndarray, closes: np.ndarray) -> int:
+    """
+    Merge downloaded bars into the store.
+
+    Bars on or after the first downloaded date replace stored ones (the latest
+    bar may have been an intraday price); older stored bars are kept.
+
+    Returns:
+        Number of bars added or changed
+    """
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    closes = np.asarray(closes, dtype=float)
+    valid = np.isfinite(closes)
+    dates, closes = dates[valid], closes[valid]
+    if len(dates) == 0:
+        mark_checked(ticker)
+        return 0
+
+    order = np.argsort(dates, kind="stable")
+    dates, closes = dates[order], closes[order]
+
+    existing = read(ticker)
+    if existing is not None and len(existing):
+        kept = existing[existing["date"] < dates[0]]
+        overlap = existing[existing["date"] >= dates[0]]
+        position = np.minimum(np.searchsorted(overlap["date"], dates), max(len(overlap) - 1, 0))
+        unchanged = (
+            (overlap["date"][position] == dates) & (overlap["close"][position] == closes)
+            if len(overlap) else np.zeros(len(dates), dtype=bool)
+        )
+        changed = len(dates) - int(unchanged.sum())
+        if changed == 0 and len(overlap) == len(dates):
+            mark_checked(ticker)
+            return 0
+    else:
+        kept = np.zeros(0, dtype=BAR_DTYPE)
+        changed = len(dates)
+
+    bars = np.empty(len(kept) + len(dates), dtype=BAR_DTYPE)
+    bars[:len(kept)] = kept
+    bars["date"][len(kept):] = dates
+    bars["close"][len(kept):] = closes
+    _write(ticker, bars)
+    return changed
+
+
+def get_closes(tickers: List[str], since: date) -> pd.DataFrame:
+    """
+    Stored closing prices from `since` onward, one column per ticker.
+
+    Each ticker's slice is a view of its memory-mapped file; only the final
+    date alignment copies.
+    """
+    columns = {}
+    start = np.datetime64(since, "D")
+    for ticker in tickers:
+        bars = read(ticker)
+        if bars is None or len(bars) == 0:
+            continue
+        window = bars[np.searchsorted(bars["date"], start):]
+        columns[ticker] = pd.Series(window["close"], index=pd.DatetimeIndex(window["date"]), copy=False)
+
+    if not columns:
+        return pd.DataFrame(columns=tickers, dtype=float)
+    return pd.DataFrame(columns).reindex(columns=tickers).sort_index()
@@ -0,0 +1,86 @@
+"""
+Upstream API Rate Limiting
+
+Token bucket per market data provider: up to `burst` calls go through at once,
+then calls are spaced at `rate` per second. Rate and burst are configurable per
+provider through environment variables.
+
+A caller reserves a token and gets back how long it must wait; only that caller
+waits. The fetchers are synchronous (yfinance and requests are blocking, so the
+endpoints that reach them are plain `def` and run in FastAPI's threadpool, off
+the event loop) and use `acquire_blocking(provider)`. No lock is held while
+waiting, so callers for other providers, or cache hits, never queue behind a
+slow one.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+# provider -> (default calls per second, default burst)
+PROVIDER_DEFAULTS = {
+    "yfinance": (1.0, 2),
+    "alpha_vantage": (5 / 60, 5),  # Free tier: 5 requests/minute
+}
+
+
+class TokenBucket:
+    """Thread-safe token bucket that hands out wait times instead of sleeping"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: Optional[float] = None) -> Optional[float]:
+        """
+        Take one token, possibly going into debt.
+
+        Returns:
+            Seconds to wait before the call, or None (nothing taken) if that
+            would be longer than max_wait
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            delay = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if max_wait is not None and delay > max_wait:
+                return None
+            self._tokens -= 1
+            return delay
+
+    def acquire_blocking(self, max_wait: Optional[float] = None) -> bool:
+        delay = self.reserve(max_wait)
+        if delay is None:
+            return False
+        if delay > 0:
+            time.sleep(delay)
+        return True
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(provider: str) -> TokenBucket:
+    """
+    Bucket for a provider, configured from <PROVIDER>_RATE_PER_SECOND and
+    <PROVIDER>_BURST (e.g. YFINANCE_RATE_PER_SECOND) or PROVIDER_DEFAULTS.
+    """
+    with _buckets_lock:
+        if provider not in _buckets:
+            default_rate, default_burst = PROVIDER_DEFAULTS.get(provider, (1.0, 1))
+            prefix = provider.upper()
+            rate = float(os.getenv(f"{prefix}_RATE_PER_SECOND", default_rate))
+            burst = int(os.getenv(f"{prefix}_BURST", default_burst))
+            _buckets[provider] = TokenBucket(rate, burst)
+        return _buckets[provider]
+
+
+def acquire_blocking(provider: str, max_wait: Optional[float] = None) -> bool:
+    """Wait in the calling thread until a call to provider is allowed (False if over max_wait)"""
+    return get_bucket(provider).acquire_blocking(max_wait)
@@ -0,0 +1,182 @@
+"""
+Rebalancing Simulator
+
+Runs a portfolio allocation forward under simulated market paths and measures what
+rebalancing actually does:
+- Calendar schedules (the template's declared "Quarterly" / "Semi-annually", etc.)
+- Threshold rebalancing (only when an asset drifts too far from target)
+- Trading costs on every rebalance
+- Comparison against never rebalancing
+
+All schedules share the same simulated paths and are stepped together in one
+(schedules x paths x assets) array, so adding schedules or paths stays cheap.
+"""
+
+from typing import Dict, List, Optional
+import numpy as np
+from app.services import portfolio_optimizer
+
+# Calendar rebalancing frequencies (months between rebalances)
+REBALANCE_PERIODS = {
+    "Monthly": 1,
+    "Quarterly": 3,
+    "Semi-annually": 6,
+    "Annually": 12,
+}
+
+DEFAULT_THRESHOLD = 0.05  # Rebalance when any asset drifts 5 percentage points
+DEFAULT_TRADING_COST_BPS = 5.0  # Spread + commission per dollar traded
+
+
+def build_schedules(declared_frequency: Optional[str] = None, threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+    """
+    Standard set of schedules to compare.
+
+    Each schedule has a name, period_months (0 = no calendar) and threshold
+    (0 = no drift band). Calendar + threshold means "check on the calendar date,
+    trade only if drift exceeds the band".
+    """
+    schedules = [{"name": "Never", "period_months": 0, "threshold": 0.0}]
+    for name, months in REBALANCE_PERIODS.items():
+        schedules.append({"name": name, "period_months": months, "threshold": 0.0})
+    schedules.append({"name": f"Threshold {threshold * 100:.0f}%", "period_months": 0, "threshold": threshold})
+    if declared_frequency in REBALANCE_PERIODS:
+        schedules.append({
+            "name": f"{declared_frequency} + {threshold * 100:.0f}% band",
+            "period_months": REBALANCE_PERIODS[declared_frequency],
+            "threshold": threshold
+        })
+    return schedules
+
+
+def simulate_monthly_returns(
+    tickers: List[str],
+    months: int,
+    num_paths: int,
+    seed: Optional[int] = None
+) -> np.ndarray:
+    """
+    Simulate monthly gross returns (1 + r) for each ticker.
+
+    Uses correlated lognormal returns from the cached return statistics.
+
+    Returns:
+        Array with shape (num_paths, months, len(tickers))
+    """
+    mu, cov, _ = portfolio_optimizer.get_return_statistics(tickers)
+
+    # Annual arithmetic mean -> monthly log-return drift
+    monthly_cov = cov / 12
+    monthly_drift = np.log1p(mu) / 12 - 0.5 * np.diag(monthly_cov)
+
+    # Small jitter keeps Cholesky stable when two funds are nearly identical (BND/AGG)
+    chol = np.linalg.cholesky(monthly_cov + np.eye(len(tickers)) * 1e-10)
+    rng = np.random.default_rng(seed)
+    shocks = rng.standard_normal((num_paths, months, len(tickers))) @ chol.T
+    return np.exp(monthly_drift + shocks)
+
+
+def simulate_rebalancing(
+    allocation: Dict[str, float],
+    schedules: List[Dict],
+    years: int = 10,
+    num_paths: int = 1000,
+    trading_cost_bps: float = DEFAULT_TRADING_COST_BPS,
+    initial_value: float = 10000.0,
+    seed: Optional[int] = 42
+) -> Dict:
+    """
+    Simulate an allocation under several rebalancing schedules.
+
+    Args:
+        allocation: ticker -> target percentage (need not sum to exactly 100)
+        schedules: Output of build_schedules (or the same shape)
+        years: Simulation length
+        num_paths: Number of simulated market paths (shared by all schedules)
+        trading_cost_bps: Cost per dollar traded, in basis points
+        initial_value: Starting portfolio value
+        seed: Random seed (None for a fresh draw)
+
+    Returns:
+        Per-schedule annualized return, volatility, rebalance count, trading costs
+        and drift, plus the difference versus never rebalancing
+    """
+    tickers = [t for t, pct in allocation.items() if pct > 0]
+    target = np.array([allocation[t] for t in tickers], dtype=float)
+    target /= target.sum()
+
+    months = years * 12
+    gross = simulate_monthly_returns(tickers, months, num_paths, seed)
+
+    period = np.array([s["period_months"] for s in schedules])[:, None]
+    threshold = np.array([s["threshold"] for s in schedules])[:, None]
+    cost_rate = trading_cost_bps / 10000
+
+    num_schedules = len(schedules)
+    holdings = np.broadcast_to(initial_value * target, (num_schedules, num_paths, len(tickers))).copy()
+    values = np.empty((num_schedules, num_paths, months + 1))
+    values[:, :, 0] = initial_value
+    rebalance_count = np.zeros((num_schedules, num_paths))
+    total_costs = np.zeros((num_schedules, num_paths))
+    drift_sum = np.zeros((num_schedules, num_paths))
+
+    for month in range(1, months + 1):
+        holdings *= gross[None, :, month - 1, :]
+        value = holdings.sum(axis=2)
+        weights = holdings / value[:, :, None]
+        drift = np.abs(weights - target).max(axis=2)
+        drift_sum += drift
+
+        on_calendar = (period > 0) & (month % np.maximum(period, 1) == 0)
+        trigger = np.where(
+            threshold > 0,
+            np.where(period > 0, on_calendar, True) & (drift > threshold),
+            on_calendar
+        )
+
+        if trigger.any():
+            # Every dollar sold or bought pays the trading cost
+            turnover = np.abs(holdings - value[:, :, None] * target).sum(axis=2)
+            cost = np.where(trigger, turnover * cost_rate, 0.0)
+            new_value = value - cost
+            holdings = np.where(trigger[:, :, None], new_value[:, :, None] * target, holdings)
+            rebalance_count += trigger
+            total_costs += cost
+            value = np.where(trigger, new_value, value)
+
+        values[:, :, month] = value
+
+    log_returns = np.diff(np.log(values), axis=2)
+    annual_return = np.expm1(log_returns.mean(axis=(1, 2)) * 12)
+    annual_volatility = log_returns.std(axis=2).mean(axis=1) * np.sqrt(12)
+    terminal = values[:, :, -1]
+
+    results = []
+    for i, schedule in enumerate(schedules):
+        results.append({
+            "schedule": schedule["name"],
+            "period_months": int(schedule["period_months"]),
+            "threshold": float(schedule["threshold"]),
+            "annualized_return": round(float(annual_return[i]) * 100, 2),
+            "annualized_volatility": round(float(annual_volatility[i]) * 100, 2),
+            "median_ending_value": round(float(np.median(terminal[i])), 2),
+            "ending_value_5th_percentile": round(float(np.percentile(terminal[i], 5)), 2),
+            "rebalances_per_year": round(float(rebalance_count[i].mean()) / years, 2),
+            "total_trading_costs": round(float(total_costs[i].mean()), 2),
+            "average_drift": round(float(drift_sum[i].mean()) / months * 100, 2),
+        })
+
+    baseline = next((r for r in results if r["period_months"] == 0 and r["threshold"] == 0), None)
+    if baseline is not None:
+        for r in results:
+            r["return_vs_never"] = round(r["annualized_return"] - baseline["annualized_return"], 2)
+            r["volatility_vs_never"] = round(r["annualized_volatility"] - baseline["annualized_volatility"], 2)
+
+    return {
+        "allocation": {t: round(float(w) * 100, 1) for t, w in zip(tickers, target)},
+        "years": years,
+        "num_paths": num_paths,
+        "trading_cost_bps": trading_cost_bps,
+        "initial_value": initial_value,
+        "schedules": results
+    }
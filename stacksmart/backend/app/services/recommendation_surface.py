@@ -0,0 +1,248 @@
+"""
+Precomputed Recommendation Surface
+
+Answers /api/optimize without simulating when the monthly breakdown isn't needed.
+
+calculate_optimization_path scales with the loan: multiplying principal, minimum
+payment and budget by k multiplies every balance by k. So the loan balances only
+need three dimensions - interest rate, minimum/principal and budget/principal -
+plus the month axis, which one simulation fills for every horizon at once. Both
+paths' balances (per $1 of principal) are stored for every grid point in a
+memory-mapped file shared by all workers. The file lives in the app's private
+runtime directory and starts with a header (format version, hash of the grid
+axes, checksum of the data) that is verified before the file is trusted. The portfolio has a closed form and is
+computed exactly per request.
+
+A request inside the grid is answered by interpolating between the 8 surrounding
+grid points. Requests fall back to the full simulation when they are outside the
+grid, when a loan is paid off between grid points (the balance has a kink there),
+or when the surrounding points disagree on the recommendation.
+"""
+
+import hashlib
+import os
+import struct
+import threading
+from typing import Optional
+import numpy as np
+from app.models.schemas import LoanData, MarketAssumptions, OptimizationResult
+from app.services.optimization_engine import (
+    project_loan_balances,
+    generate_investment_allocations
+)
+from app.services import runtime_paths
+
+# Grid axes (bump SURFACE_VERSION whenever these change)
+SURFACE_VERSION = 1
+RATE_AXIS = np.linspace(0.0, 0.15, 31)  # Loan interest rate
+MINIMUM_RATIO_AXIS = np.linspace(0.0, 0.06, 31)  # Minimum payment / principal
+BUDGET_RATIO_AXIS = np.linspace(0.0, 0.30, 61)  # Monthly budget / principal
+MIN_RETURN, MAX_RETURN = 0.04, 0.12
+MAX_MONTHS = 120
+MAX_BUDGET = 5000.0
+
+SURFACE_PATH = os.getenv("RECOMMENDATION_SURFACE_PATH")  # Default: optimize_surface.dat in runtime_paths.RUNTIME_DIR
+
+_AXES = (RATE_AXIS, MINIMUM_RATIO_AXIS, BUDGET_RATIO_AXIS)
+_SHAPE = tuple(len(axis) for axis in _AXES) + (MAX_MONTHS, 2)  # last axis: loan balance on (debt path, invest path)
+
+# File header: magic, SURFACE_VERSION, SHA-256 of the grid definition, SHA-256 of the data
+_HEADER = struct.Struct("<4sI32s32s")
+_MAGIC = b"SSRS"
+_AXES_HASH = hashlib.sha256(
+    b"".join(np.ascontiguousarray(axis, dtype="<f8").tobytes() for axis in _AXES)
+    + np.array(_SHAPE, dtype="<i8").tobytes()
+).digest()
+
+_surface: Optional[np.memmap] = None
+_build_lock = threading.Lock()
+
+
+def _simulate_grid() -> np.ndarray:
+    """Loan balance per $1 of principal on both paths, for every grid point and month"""
+    rate = RATE_AXIS[:, None, None]
+    minimum = MINIMUM_RATIO_AXIS[None, :, None]
+    budget = BUDGET_RATIO_AXIS[None, None, :]
+    months = np.ones(MAX_MONTHS)
+
+    surface = np.empty(_SHAPE, dtype=np.float32)
+    # Debt path: whole budget goes to the loan
+    surface[..., 0] = project_loan_balances(1.0, rate, (minimum + budget)[..., None] * months)
+    # Invest path: minimum payment only (same for every budget)
+    surface[..., 1] = project_loan_balances(1.0, rate, minimum[..., None] * months)
+    return surface
+
+
+def _surface_path() -> str:
+    return SURFACE_PATH or runtime_paths.private_path("optimize_surface.dat")
+
+
+def _open_verified(path: str) -> Optional[np.memmap]:
+    """Memory-map the surface at path if its header matches this grid and its data checksum, else None"""
+    expected_bytes = int(np.prod(_SHAPE)) * np.dtype(np.float32).itemsize
+    try:
+        if os.path.getsize(path) != _HEADER.size + expected_bytes:
+            return None
+        with open(path, "rb") as f:
+            magic, version, axes_hash, checksum = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC or version != SURFACE_VERSION or axes_hash != _AXES_HASH:
+            return None
+        surface = np.memmap(path, dtype=np.float32, mode="r", shape=_SHAPE, offset=_HEADER.size)
+    except (OSError, struct.error, ValueError):
+        return None
+    if hashlib.sha256(surface).digest() != checksum:
+        print(f"[ERROR] Recommendation surface checksum mismatch in {path}")
+        return None
+    return surface
+
+
+def build_surface(force: bool = False) -> None:
+    """
+    Compute the surface and write it to the surface path, or open the existing
+    file if its header and checksum match this grid.
+
+    Meant to run once at startup in a background thread; until it finishes,
+    requests use the full simulation.
+    """
+    global _surface
+    with _build_lock:
+        if _surface is not None and not force:
+            return
+
+        path = _surface_path()
+        surface = None if force else _open_verified(path)
+        if surface is None:
+            print(f"[INFO] Building recommendation surface {_SHAPE[:3]} x {MAX_MONTHS} months...")
+            data = _simulate_grid()
+
+            # Write to a temp file then rename, so other workers never open a partial file
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, SURFACE_VERSION, _AXES_HASH, hashlib.sha256(data).digest()))
+                f.write(data.tobytes())
+            os.replace(tmp_path, path)
+            print(f"[INFO] Recommendation surface written to {path} ({data.nbytes / 1e6:.1f} MB)")
+
+            surface = _open_verified(path)
+            if surface is None:
+                raise RuntimeError(f"Recommendation surface at {path} failed verification after writing")
+
+        _surface = surface
+
+
+def start_background_build() -> threading.Thread:
+    """Build the surface without blocking startup"""
+    def _run():
+        try:
+            build_surface()
+        except Exception as e:
+            print(f"[ERROR] Recommendation surface build failed: {str(e)}")
+
+    thread = threading.Thread(target=_run, name="recommendation-surface", daemon=True)
+    thread.start()
+    return thread
+
+
+def is_ready() -> bool:
+    return _surface is not None
+
+
+def _bracket(axis: np.ndarray, value: float):
+    """Lower grid index and interpolation weight, or None outside the axis"""
+    if value < axis[0] or value > axis[-1]:
+        return None
+    i = int(min(np.searchsorted(axis, value, side="right") - 1, len(axis) - 2))
+    return i, (value - axis[i]) / (axis[i + 1] - axis[i])
+
+
+def lookup_optimization(
+    loan_data: LoanData,
+    market_assumptions: MarketAssumptions,
+    monthly_budget: float,
+    months_until_graduation: int = 48
+) -> Optional[OptimizationResult]:
+    """
+    Interpolated calculate_optimization_path without the monthly breakdown.
+
+    Returns:
+        OptimizationResult with an empty monthly_breakdown, or None when the
+        request must use the full simulation (surface not built, outside the
+        grid, payoff between grid points, or too close to the decision boundary)
+    """
+    surface = _surface
+    months = months_until_graduation
+    principal = loan_data.principal
+    if surface is None or months > MAX_MONTHS or monthly_budget > MAX_BUDGET:
+        return None
+
+    annual_return = market_assumptions.expected_annual_return
+    if not MIN_RETURN <= annual_return <= MAX_RETURN:
+        return None
+
+    point = (
+        loan_data.interest_rate,
+        loan_data.minimum_payment / principal,
+        monthly_budget / principal
+    )
+    brackets = [_bracket(axis, value) for axis, value in zip(_AXES, point)]
+    if any(b is None for b in brackets):
+        return None
+
+    # The 8 surrounding grid points and their multilinear weights
+    offsets = np.array(np.meshgrid(*([[0, 1]] * 3), indexing="ij")).reshape(3, -1)
+    lower = np.array([b[0] for b in brackets])[:, None]
+    t = np.array([b[1] for b in brackets])[:, None]
+    weights = np.prod(np.where(offsets == 1, t, 1 - t), axis=0)
+    corners = np.asarray(surface[tuple(lower + offsets)][:, :months, :], dtype=float)  # (8, months, 2)
+
+    # A payoff between grid points puts a kink in the balance that interpolation smooths over
+    paid_off = corners[:, -1, :] <= 0
+    if (paid_off.any(axis=0) & ~paid_off.all(axis=0)).any():
+        return None
+
+    balances = np.tensordot(weights, corners, axes=1) * principal  # (months, 2)
+
+    # Portfolio: budget invested at the start of each month (closed form of calculate_investment_path)
+    monthly_return = annual_return / 12
+    elapsed = np.arange(1, months + 1)
+    portfolio = monthly_budget * (1 + monthly_return) * ((1 + monthly_return) ** elapsed - 1) / monthly_return
+
+    net_worth_debt = 0.0 - balances[:, 0]
+    net_worth_invest = portfolio - balances[:, 1]
+
+    # Near the decision boundary interpolation can pick the wrong side
+    corner_gap = (portfolio[-1] - corners[:, -1, 1] * principal) + corners[:, -1, 0] * principal
+    if not ((corner_gap > 0).all() or (corner_gap <= 0).all()):
+        return None
+
+    final_debt_path = float(net_worth_debt[-1])
+    final_invest_path = float(net_worth_invest[-1])
+    recommendation = "pay_debt" if final_debt_path > final_invest_path else "invest"
+
+    # Same confidence and crossover rules as calculate_optimization_path
+    gap = abs(final_debt_path - final_invest_path)
+    max_value = max(abs(final_debt_path), abs(final_invest_path))
+    confidence = min(1.0, gap / (max_value + 1)) if max_value > 0 else 0.5
+
+    ahead = net_worth_debt > net_worth_invest
+    crossings = np.flatnonzero(~ahead[:-1] & ahead[1:])
+    crossover_month = int(crossings[0]) + 1 if len(crossings) else None
+
+    investment_allocations = None
+    investment_strategy = None
+    if recommendation == "invest":
+        investment_allocations, investment_strategy = generate_investment_allocations(
+            monthly_budget=monthly_budget,
+            months_until_graduation=months
+        )
+
+    return OptimizationResult(
+        recommendation=recommendation,
+        net_worth_debt_path=round(final_debt_path, 2),
+        net_worth_invest_path=round(final_invest_path, 2),
+        monthly_breakdown=[],
+        crossover_month=crossover_month,
+        confidence_score=round(confidence, 3),
+        investment_allocations=investment_allocations,
+        investment_strategy=investment_strategy
+    )
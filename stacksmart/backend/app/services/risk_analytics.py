@@ -0,0 +1,289 @@
+"""
+Holdings Risk Analytics
+
+Risk metrics for the user's actual Plaid holdings, from cached price history:
+- Annualized portfolio volatility
+- Beta to VOO (the S&P 500)
+- One-day historical Value at Risk and Conditional VaR (expected shortfall)
+- Herfindahl concentration and the effective number of holdings
+
+Daily returns, the covariance matrix and each security's beta are computed once
+per ticker set and market data version. Per request only the holding weights
+change, so the analytics are a few matrix-vector products.
+
+The same statistics back per-ETF analytics for any ticker set: volatility
+(full year and rolling), max drawdown, Sharpe ratio and the correlation matrix.
+Funds with less than a year of prices are measured over the days they have;
+missing early history is never filled in.
+"""
+
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from app.services import market_data_fetcher, price_history_store
+from app.services.holdings_rebalancer import aggregate_holdings, CASH_KEY
+
+TRADING_DAYS_PER_YEAR = 252
+BENCHMARK_TICKER = "VOO"
+VAR_CONFIDENCE = 0.95
+MIN_HISTORY_DAYS = 20
+MAX_CACHED_TICKER_SETS = 64
+ROLLING_WINDOW_DAYS = 21  # About one trading month for recent volatility
+MAX_ANALYTICS_TICKERS = 50
+
+# (sorted tickers, market data version, stored only) -> return statistics
+_stats_cache: Dict[Tuple, Optional[Dict]] = {}
+# (sorted tickers, market data version, risk-free rate) -> ETF analytics
+_analytics_cache: Dict[Tuple, Dict] = {}
+_cache_lock = threading.Lock()
+
+
+def _get_return_statistics(tickers: List[str], stored_only: bool = False) -> Optional[Dict]:
+    """
+    Daily returns, annualized covariance and beta to VOO for a set of tickers.
+
+    With stored_only, prices come straight from price_history_store and nothing
+    is downloaded: tickers the store doesn't hold are simply left out.
+
+    Tickers with fewer than MIN_HISTORY_DAYS of returns are left out of the
+    result. Before a fund's first price its returns are NaN; covariances and
+    betas are pairwise over the days both series have prices.
+
+    Returns:
+        Dict with 'tickers', 'dates', 'returns' (days x tickers, NaN before each
+        fund's history starts), 'valid_days', 'covariance' and 'betas', or None
+        if no price history is available
+    """
+    tickers = sorted(set(tickers))
+    key = (tuple(tickers), market_data_fetcher.get_market_data_version(), stored_only)
+    with _cache_lock:
+        if key in _stats_cache:
+            return _stats_cache[key]
+
+    download = tickers if BENCHMARK_TICKER in tickers else tickers + [BENCHMARK_TICKER]
+    if stored_only:
+        since = (datetime.now() - timedelta(days=market_data_fetcher.HISTORY_DAYS)).date()
+        history = price_history_store.get_closes(download, since).dropna(how="all")
+    else:
+        history = market_data_fetcher.get_price_history(download)
+
+    stats = None
+    if history is not None and len(history) >= MIN_HISTORY_DAYS and BENCHMARK_TICKER in history.columns:
+        # Fill gaps inside each series only; days before a fund's first price stay missing
+        daily = history.dropna(axis=1, how="all").ffill().pct_change(fill_method=None).iloc[1:]
+        valid_days = daily.notna().sum()
+        available = [t for t in tickers if valid_days.get(t, 0) >= MIN_HISTORY_DAYS]
+        if available and valid_days.get(BENCHMARK_TICKER, 0) >= MIN_HISTORY_DAYS:
+            returns = daily[available].to_numpy(dtype=float)
+            benchmark = daily[BENCHMARK_TICKER].to_numpy(dtype=float)[:, None]
+
+            # Beta of each fund over the days it and the benchmark both have returns
+            both = ~np.isnan(returns) & ~np.isnan(benchmark)
+            overlap = both.sum(axis=0)
+            centered = np.where(both, returns - np.nanmean(np.where(both, returns, np.nan), axis=0), 0.0)
+            bench_centered = np.where(both, benchmark - np.nanmean(np.where(both, benchmark, np.nan), axis=0), 0.0)
+            bench_var = (bench_centered ** 2).sum(axis=0)
+            betas = np.divide(
+                (centered * bench_centered).sum(axis=0), bench_var,
+                out=np.zeros(len(available)), where=(bench_var > 0) & (overlap > 1)
+            )
+
+            stats = {
+                'tickers': available,
+                'dates': daily.index,
+                'returns': returns,
+                'valid_days': valid_days[available].to_numpy(),
+                'covariance': daily[available].cov(min_periods=2).fillna(0.0).to_numpy() * TRADING_DAYS_PER_YEAR,
+                'betas': betas,
+                'history_days': len(daily),
+            }
+
+    # The download may have bumped the version; key on the latest one and drop older versions
+    version = market_data_fetcher.get_market_data_version()
+    with _cache_lock:
+        for stale in [k for k in _stats_cache if k[1] != version]:
+            del _stats_cache[stale]
+        if len(_stats_cache) >= MAX_CACHED_TICKER_SETS:
+            _stats_cache.pop(next(iter(_stats_cache)))
+        _stats_cache[(tuple(tickers), version, stored_only)] = stats
+    return stats
+
+
+def calculate_holdings_risk(holdings: List[Dict]) -> Dict:
+    """
+    Portfolio risk metrics for the current holdings.
+
+    Cash counts as a riskless position. Securities without price history are
+    left out of volatility, beta and VaR (see coverage_percent) but still count
+    toward concentration.
+
+    Args:
+        holdings: plaid_service.get_investment_holdings()['holdings']
+
+    Returns:
+        Volatility, beta, VaR/CVaR (percent and dollars) and concentration
+    """
+    keys, values, _ = aggregate_holdings(holdings)
+    total_value = float(values.sum())
+    if total_value <= 0:
+        return {'available': False, 'reason': 'No holdings with a positive value'}
+
+    # Concentration over every position, cash included
+    position_weights = values / total_value
+    herfindahl = float(np.sum(position_weights ** 2))
+    largest = int(np.argmax(position_weights))
+
+    result = {
+        'available': False,
+        'total_value': round(total_value, 2),
+        'herfindahl_index': round(herfindahl, 4),
+        'effective_number_of_holdings': round(1 / herfindahl, 2),
+        'largest_position': {
+            'ticker': str(keys[largest]),
+            'percent': round(float(position_weights[largest]) * 100, 2)
+        },
+    }
+
+    is_cash = keys == CASH_KEY
+    securities = [str(k) for k in keys[~is_cash]]
+    stats = _get_return_statistics(securities) if securities else None
+    if stats is None:
+        result['reason'] = 'Price history unavailable'
+        return result
+
+    # Weights over the priced securities and cash, renormalized to sum to 1
+    index = {k: i for i, k in enumerate(keys)}
+    priced_values = values[[index[t] for t in stats['tickers']]]
+    cash_value = float(values[is_cash].sum())
+    covered_value = float(priced_values.sum()) + cash_value
+    weights = priced_values / covered_value
+
+    volatility = float(np.sqrt(max(weights @ stats['covariance'] @ weights, 0.0)))
+    beta = float(weights @ stats['betas'])
+
+    # Historical simulation: replay every past day on which all holdings traded on today's weights
+    returns = stats['returns']
+    complete = returns[~np.isnan(returns).any(axis=1)]
+    daily = complete @ weights
+    var = float(-np.quantile(daily, 1 - VAR_CONFIDENCE))
+    tail = daily[daily <= -var]
+    cvar = float(-tail.mean()) if len(tail) else var
+
+    result.update({
+        'available': True,
+        'coverage_percent': round(covered_value / total_value * 100, 2),
+        'history_days': len(complete),
+        'annual_volatility': round(volatility * 100, 2),
+        'beta_to_voo': round(beta, 3),
+        'var_confidence': VAR_CONFIDENCE,
+        'daily_var_percent': round(var * 100, 2),
+        'daily_cvar_percent': round(cvar * 100, 2),
+        'daily_var_dollars': round(var * covered_value, 2),
+        'daily_cvar_dollars': round(cvar * covered_value, 2),
+    })
+    return result
+
+
+def calculate_etf_analytics(tickers: List[str], risk_free_rate: float) -> Dict:
+    """
+    Risk and return analytics for a set of ETFs over the stored year of prices.
+
+    Only prices already in price_history_store are used (the prewarmer keeps
+    the served ETF universe there); tickers it doesn't hold are reported in
+    unavailable_tickers and never trigger a download. Every metric is computed
+    for all tickers at once from the cached daily returns, each fund over the
+    days it has prices (see history_days), and the result is memoized per
+    market data version.
+
+    Args:
+        tickers: ETF tickers
+        risk_free_rate: Annual risk-free rate as decimal (MarketAssumptions.risk_free_rate)
+
+    Returns:
+        Per-ticker annual return, volatility (full period and last month),
+        max drawdown and Sharpe ratio, the rolling one-month volatility series
+        and the pairwise correlation matrix
+    """
+    tickers = sorted(set(t.upper() for t in tickers))
+    if not tickers:
+        raise ValueError("At least one ticker is required")
+    if len(tickers) > MAX_ANALYTICS_TICKERS:
+        raise ValueError(f"At most {MAX_ANALYTICS_TICKERS} tickers per request")
+
+    key = (tuple(tickers), market_data_fetcher.get_market_data_version(), risk_free_rate)
+    with _cache_lock:
+        if key in _analytics_cache:
+            return _analytics_cache[key]
+
+    stats = _get_return_statistics(tickers, stored_only=True)
+    if stats is None:
+        return {'available': False, 'reason': 'Price history unavailable', 'unavailable_tickers': tickers}
+
+    daily = stats['returns']
+    valid_days = stats['valid_days']
+    volatility = np.sqrt(np.diag(stats['covariance']))
+
+    # Annualized volatility over a trailing one-month window, for every day with a full window
+    rolling = (
+        pd.DataFrame(daily, index=stats['dates']).rolling(ROLLING_WINDOW_DAYS).std()
+        * np.sqrt(TRADING_DAYS_PER_YEAR)
+    )
+    recent_volatility = rolling.to_numpy()[-1]
+    rolling = rolling.dropna(how="all")
+    rolling_values = rolling.to_numpy()
+
+    # Growth of $1 and its running peak (starting at $1) give the drawdown path;
+    # before a fund's first price it simply stays at $1
+    growth = np.cumprod(1 + np.nan_to_num(daily), axis=0)
+    peaks = np.maximum.accumulate(np.vstack([np.ones(daily.shape[1]), growth]), axis=0)[1:]
+    max_drawdown = (growth / peaks - 1).min(axis=0)
+
+    annual_return = growth[-1] ** (TRADING_DAYS_PER_YEAR / valid_days) - 1
+    sharpe = np.divide(annual_return - risk_free_rate, volatility, out=np.full(len(volatility), np.nan), where=volatility > 0)
+
+    # Pairwise over the days both funds have prices
+    correlation = pd.DataFrame(daily).corr(min_periods=2).fillna(0.0).to_numpy(copy=True)
+    np.fill_diagonal(correlation, 1.0)
+
+    result = {
+        'available': True,
+        'history_days': stats['history_days'],
+        'risk_free_rate': risk_free_rate,
+        'etfs': [
+            {
+                'ticker': ticker,
+                'history_days': int(valid_days[i]),
+                'annual_return': round(float(annual_return[i]) * 100, 2),
+                'annual_volatility': round(float(volatility[i]) * 100, 2),
+                'recent_volatility': round(float(recent_volatility[i]) * 100, 2) if np.isfinite(recent_volatility[i]) else None,
+                'max_drawdown': round(float(max_drawdown[i]) * 100, 2),
+                'sharpe_ratio': round(float(sharpe[i]), 3) if np.isfinite(sharpe[i]) else None
+            }
+            for i, ticker in enumerate(stats['tickers'])
+        ],
+        # One series per ticker, aligned with 'dates'
+        'rolling_volatility': {
+            'window_days': ROLLING_WINDOW_DAYS,
+            'dates': [d.strftime('%Y-%m-%d') for d in rolling.index],
+            'values_by_ticker': {
+                ticker: [round(float(v) * 100, 2) if np.isfinite(v) else None for v in rolling_values[:, i]]
+                for i, ticker in enumerate(stats['tickers'])
+            }
+        },
+        'correlation': {
+            'tickers': stats['tickers'],
+            'matrix': np.round(correlation, 3).tolist()
+        },
+        'unavailable_tickers': [t for t in tickers if t not in stats['tickers']]
+    }
+
+    version = market_data_fetcher.get_market_data_version()
+    with _cache_lock:
+        for stale in [k for k in _analytics_cache if k[1] != version]:
+            del _analytics_cache[stale]
+        if len(_analytics_cache) >= MAX_CACHED_TICKER_SETS:
+            _analytics_cache.pop(next(iter(_analytics_cache)))
+        _analytics_cache[(tuple(tickers), version, risk_free_rate)] = result
+    return result
@@ -0,0 +1,34 @@
+"""
+Private Runtime Storage
+
+Files that workers write and read back (the shared cache database, the
+recommendation surface) live in one directory owned by the app user with 0700
+permissions, never at a predictable path in the world-writable temp directory
+where another local user could plant them.
+
+Defaults to backend/.runtime; override with STACKSMART_RUNTIME_DIR.
+"""
+
+import os
+import stat
+
+RUNTIME_DIR = os.getenv(
+    "STACKSMART_RUNTIME_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), ".runtime")
+)
+
+
+def private_path(filename: str) -> str:
+    """
+    Path for filename inside RUNTIME_DIR, creating the directory (mode 0700) if needed.
+
+    Raises:
+        PermissionError: if the directory belongs to another user
+    """
+    os.makedirs(RUNTIME_DIR, mode=0o700, exist_ok=True)
+    info = os.stat(RUNTIME_DIR)
+    if info.st_uid != os.getuid():
+        raise PermissionError(f"Runtime directory {RUNTIME_DIR} is not owned by this user")
+    if stat.S_IMODE(info.st_mode) & 0o077:
+        os.chmod(RUNTIME_DIR, 0o700)
+    return os.path.join(RUNTIME_DIR, filename)
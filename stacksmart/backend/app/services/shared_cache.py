@@ -0,0 +1,142 @@
+"""
+Shared Market Data Cache
+
+Second cache tier shared by every uvicorn worker on the host, backed by a local
+SQLite file. Each service keeps its in-process dict as the L1; on an L1 miss it
+checks here before calling yfinance or Alpha Vantage, so one worker's download
+serves all of them.
+
+Also holds shared counters (the market data version), so derived caches in
+every worker invalidate together.
+
+Values are stored as JSON (DataFrames as index/columns/data), never pickled,
+and the database lives in the app's private runtime directory. Entries older
+than any reader accepts are deleted as new ones are written.
+
+Failures are logged and treated as misses; the shared tier never breaks a
+request.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Optional, Tuple
+import numpy as np
+import pandas as pd
+from app.services import market_calendar, runtime_paths
+
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH")  # Default: shared_cache.sqlite3 in runtime_paths.RUNTIME_DIR
+BUSY_TIMEOUT_SECONDS = 2.0
+# Oldest entry any reader accepts: market_data_fetcher.MAX_STALE_MINUTES past the longest market closure
+MAX_ENTRY_AGE_SECONDS = 24 * 3600 + market_calendar.MAX_CLOSURE_SECONDS
+PURGE_INTERVAL_SECONDS = 60
+
+_local = threading.local()
+_last_purge = 0.0
+
+
+def _connection() -> sqlite3.Connection:
+    """One connection per thread (sqlite3 connections aren't shared across threads)"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        path = SHARED_CACHE_PATH or runtime_paths.private_path("shared_cache.sqlite3")
+        conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, stored_at REAL NOT NULL, "
+            "PRIMARY KEY (namespace, key))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_stored_at ON cache (stored_at)")
+        conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        _local.conn = conn
+    return conn
+
+
+def _to_json(value: Any) -> Any:
+    """json.dumps fallback for the pandas/numpy values the market data caches hold"""
+    if isinstance(value, pd.DataFrame):
+        return {"__dataframe__": {
+            "index": [i.isoformat() if isinstance(i, (date, datetime)) else i for i in value.index],
+            "datetime_index": isinstance(value.index, pd.DatetimeIndex),
+            "columns": list(value.columns),
+            "data": value.to_numpy().tolist(),
+        }}
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _from_json(obj: dict) -> Any:
+    frame = obj.get("__dataframe__")
+    if frame is None:
+        return obj
+    index = pd.DatetimeIndex(frame["index"]) if frame["datetime_index"] else frame["index"]
+    return pd.DataFrame(frame["data"], index=index, columns=frame["columns"], dtype=float)
+
+
+def get(namespace: str, key: str, max_age_seconds: float) -> Optional[Tuple[Any, float]]:
+    """
+    Cached value and the Unix time it was stored, or None if missing or older than max_age_seconds
+    """
+    try:
+        row = _connection().execute(
+            "SELECT value, stored_at FROM cache WHERE namespace = ? AND key = ? AND stored_at > ?",
+            (namespace, key, time.time() - max_age_seconds)
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0], object_hook=_from_json), row[1]
+    except Exception as e:
+        print(f"[ERROR] Shared cache read failed for {namespace}/{key}: {str(e)}")
+        return None
+
+
+def put(namespace: str, key: str, value: Any, stored_at: Optional[float] = None) -> None:
+    """Store a value (anything JSON-serializable, DataFrames included) for every worker"""
+    global _last_purge
+    try:
+        conn = _connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, stored_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value, default=_to_json), stored_at or time.time())
+        )
+        now = time.time()
+        if now - _last_purge > PURGE_INTERVAL_SECONDS:
+            _last_purge = now
+            purged = conn.execute("DELETE FROM cache WHERE stored_at < ?", (now - MAX_ENTRY_AGE_SECONDS,)).rowcount
+            if purged:
+                print(f"[CACHE] Purged {purged} expired shared cache entries")
+    except Exception as e:
+        print(f"[ERROR] Shared cache write failed for {namespace}/{key}: {str(e)}")
+
+
+def increment(name: str) -> Optional[int]:
+    """Atomically add one to a shared counter and return the new value"""
+    try:
+        return _connection().execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1 RETURNING value",
+            (name,)
+        ).fetchone()[0]
+    except Exception as e:
+        print(f"[ERROR] Shared counter update failed for {name}: {str(e)}")
+        return None
+
+
+def get_counter(name: str) -> Optional[int]:
+    """Current value of a shared counter (0 if never incremented), or None if unavailable"""
+    try:
+        row = _connection().execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+    except Exception as e:
+        print(f"[ERROR] Shared counter read failed for {name}: {str(e)}")
+        return None
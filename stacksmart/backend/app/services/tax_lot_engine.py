@@ -0,0 +1,356 @@
+"""
+Lot-Level Cost Basis & Tax-Loss Harvesting
+
+Plaid holdings only carry an aggregate cost basis. This engine rebuilds the
+individual tax lots from the investment transaction history, per account and
+security, then:
+- Reports open lots with unrealized gain/loss and holding period
+- Computes realized gain/loss for every sale in the window
+- Scans open lots for harvestable losses
+- Flags wash-sale conflicts (same security bought within 30 days of a loss
+  sale, in any account)
+
+Lots are stored as parallel NumPy arrays sorted by (account, security, date),
+with CSR-style offsets per position. FIFO matching is done for every position
+at once: shares are laid out on one number line in purchase order, so the cost
+of any sale is the difference of a piecewise-linear cumulative-cost curve
+(a single np.interp). Specific-ID matching picks the highest-cost lots first,
+the choice that minimizes realized gains.
+
+Shares held before the transaction window become one opening lot per position,
+priced from Plaid's aggregate cost basis minus the cost of the shares bought
+inside the window. Without a usable cost basis the opening lot's cost is
+unknown (NaN internally, None in results), and so is the cost of any sale or
+gain that draws on it.
+"""
+
+import heapq
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+import numpy as np
+from app.services.performance_engine import to_date, security_key
+
+WASH_SALE_DAYS = 30
+LONG_TERM_DAYS = 365
+DEFAULT_MIN_HARVEST_LOSS = 100.0  # Dollars per lot worth harvesting
+OPENING_LOT_DAY = -10 ** 6  # Acquired before the window (date unknown)
+
+
+def build_lots(holdings: Dict, transactions: Dict, end_date: datetime, method: str = "fifo") -> Dict:
+    """
+    Rebuild tax lots and match every sale to them.
+
+    Args:
+        holdings: plaid_service.get_investment_holdings() result
+        transactions: plaid_service.get_investment_transactions() result
+        end_date: Valuation date (today)
+        method: "fifo" or "specific_id" (highest cost first)
+
+    Returns:
+        Column-oriented lot and sale arrays plus per-position index
+    """
+    if method not in ("fifo", "specific_id"):
+        raise ValueError(f"Unknown lot method: {method}")
+
+    end = to_date(end_date)
+    trades = [
+        t for t in transactions.get('transactions', [])
+        if t['type'] in ('buy', 'sell') and t.get('quantity') and security_key(t)
+    ]
+
+    # Positions: (account, security) pairs seen in holdings or trades
+    position_index = {}
+    for item in holdings.get('holdings', []) + trades:
+        key = security_key(item)
+        if key and item.get('type') != 'cash':
+            position_index.setdefault((item['account_id'], key), len(position_index))
+    num_positions = len(position_index)
+
+    held_qty = np.zeros(num_positions)
+    held_cost = np.full(num_positions, np.nan)
+    prices = {}
+    for h in holdings.get('holdings', []):
+        key = security_key(h)
+        if key and h.get('type') != 'cash':
+            i = position_index[(h['account_id'], key)]
+            held_qty[i] += h['quantity']
+            if h.get('cost_basis') is not None:
+                held_cost[i] = np.nansum([held_cost[i], h['cost_basis']])
+            if h.get('price'):
+                prices[key] = h['price']
+
+    is_buy = np.array([t['type'] == 'buy' for t in trades], dtype=bool)
+    trade_pos = np.array([position_index[(t['account_id'], security_key(t))] for t in trades], dtype=int)
+    trade_day = np.array([(to_date(t['date']) - end).days for t in trades], dtype=int)
+    trade_qty = np.array([abs(t['quantity']) for t in trades], dtype=float)
+    trade_value = np.array([abs(t['amount']) or abs(t['quantity'] * t.get('price', 0)) for t in trades], dtype=float)
+
+    # Opening lots: shares held today that the window's trades don't explain
+    net_traded = np.bincount(trade_pos, weights=np.where(is_buy, trade_qty, -trade_qty), minlength=num_positions)
+    opening_qty = np.maximum(0.0, held_qty - net_traded)
+    has_opening = opening_qty > 1e-9
+
+    # Plaid's basis covers every share held today, window buys included. FIFO sells opening
+    # shares first, so while any are still held every window buy is too: take those out
+    bought_qty = np.bincount(trade_pos[is_buy], weights=trade_qty[is_buy], minlength=num_positions)
+    bought_cost = np.bincount(trade_pos[is_buy], weights=trade_value[is_buy], minlength=num_positions)
+    opening_held = held_qty - bought_qty
+    opening_price = np.divide(
+        held_cost - bought_cost, opening_held, out=np.full(num_positions, np.nan), where=opening_held > 1e-9
+    )
+    opening_price[opening_price < 0] = np.nan  # Basis inconsistent with the window's buys: unknown
+
+    # Lots sorted by (position, date): opening lots first
+    lot_pos = np.concatenate([np.flatnonzero(has_opening), trade_pos[is_buy]])
+    lot_day = np.concatenate([np.full(has_opening.sum(), OPENING_LOT_DAY), trade_day[is_buy]])
+    lot_qty = np.concatenate([opening_qty[has_opening], trade_qty[is_buy]])
+    lot_cost = np.concatenate([(opening_qty * opening_price)[has_opening], trade_value[is_buy]])
+    order = np.lexsort((lot_day, lot_pos))
+    lot_pos, lot_day, lot_qty, lot_cost = lot_pos[order], lot_day[order], lot_qty[order], lot_cost[order]
+    lot_offsets = np.concatenate([[0], np.cumsum(np.bincount(lot_pos, minlength=num_positions))])
+
+    sell_order = np.lexsort((trade_day[~is_buy], trade_pos[~is_buy]))
+    sale_pos = trade_pos[~is_buy][sell_order]
+    sale_day = trade_day[~is_buy][sell_order]
+    sale_qty = trade_qty[~is_buy][sell_order]
+    sale_proceeds = trade_value[~is_buy][sell_order]
+
+    if method == "fifo":
+        lot_remaining, sale_cost = _match_fifo(lot_pos, lot_qty, lot_cost, lot_offsets, sale_pos, sale_qty)
+    else:
+        lot_remaining, sale_cost = _match_highest_cost(lot_pos, lot_day, lot_qty, lot_cost, lot_offsets, sale_pos, sale_day, sale_qty)
+
+    positions = [None] * num_positions
+    for (account_id, key), i in position_index.items():
+        positions[i] = (account_id, key)
+
+    return {
+        'method': method,
+        'end_date': end,
+        'positions': positions,
+        'prices': prices,
+        'held_quantity': held_qty,
+        'plaid_cost_basis': held_cost,
+        'lot_position': lot_pos,
+        'lot_day': lot_day,
+        'lot_quantity': lot_qty,
+        'lot_cost': lot_cost,
+        'lot_remaining': lot_remaining,
+        'lot_offsets': lot_offsets,
+        'sale_position': sale_pos,
+        'sale_day': sale_day,
+        'sale_quantity': sale_qty,
+        'sale_proceeds': sale_proceeds,
+        'sale_cost': sale_cost,
+    }
+
+
+def _match_fifo(lot_pos, lot_qty, lot_cost, lot_offsets, sale_pos, sale_qty):
+    """
+    FIFO for every position at once.
+
+    Each position's lots occupy a contiguous stretch of one global share line;
+    a sale consumes the next stretch of its position's line, and its cost is
+    the cumulative-cost curve's change over that stretch. A sale that reaches
+    into a lot of unknown cost has unknown (NaN) cost.
+    """
+    num_positions = len(lot_offsets) - 1
+    unknown = np.isnan(lot_cost)
+    share_end = np.cumsum(lot_qty)
+    line = np.concatenate([[0.0], share_end])
+    curve = np.concatenate([[0.0], np.cumsum(np.where(unknown, 0.0, lot_cost))])
+    unknown_curve = np.concatenate([[0.0], np.cumsum(np.where(unknown, lot_qty, 0.0))])
+
+    position_start = line[lot_offsets[:-1]]
+    position_end = line[lot_offsets[1:]]
+
+    # Shares sold per position so far (cumulative within each position)
+    sold_total = np.cumsum(sale_qty)
+    sales_before = np.concatenate([[0.0], sold_total])[np.searchsorted(sale_pos, np.arange(num_positions))]
+    sold_after = sold_total - sales_before[sale_pos]
+    sold_before = sold_after - sale_qty
+
+    start = np.minimum(position_start[sale_pos] + sold_before, position_end[sale_pos])
+    stop = np.minimum(position_start[sale_pos] + sold_after, position_end[sale_pos])
+    sale_cost = np.interp(stop, line, curve) - np.interp(start, line, curve)
+    touches_unknown = np.interp(stop, line, unknown_curve) - np.interp(start, line, unknown_curve) > 1e-9
+    sale_cost[touches_unknown] = np.nan
+
+    consumed = np.bincount(sale_pos, weights=sale_qty, minlength=num_positions)
+    consumed_to = position_start + consumed
+    lot_remaining = np.clip(share_end - consumed_to[lot_pos], 0.0, lot_qty)
+    return lot_remaining, sale_cost
+
+
+def _match_highest_cost(lot_pos, lot_day, lot_qty, lot_cost, lot_offsets, sale_pos, sale_day, sale_qty):
+    """
+    Specific-ID: each sale takes the highest cost-per-share lots already held
+    (lots of unknown cost last; a sale drawing on one has unknown cost)
+    """
+    lot_remaining = lot_qty.copy()
+    sale_cost = np.zeros(len(sale_qty))
+    cost_per_share = np.divide(lot_cost, lot_qty, out=np.zeros(len(lot_qty)), where=lot_qty > 0)
+    priority = np.where(np.isnan(cost_per_share), np.inf, -cost_per_share)
+
+    sale_offsets = np.searchsorted(sale_pos, np.arange(len(lot_offsets)))
+    for p in range(len(lot_offsets) - 1):
+        lots = range(lot_offsets[p], lot_offsets[p + 1])
+        next_lot = lots.start
+        available = []
+        for s in range(sale_offsets[p], sale_offsets[p + 1]):
+            # Lots bought on or before the sale date become eligible
+            while next_lot < lots.stop and lot_day[next_lot] <= sale_day[s]:
+                heapq.heappush(available, (priority[next_lot], next_lot))
+                next_lot += 1
+            needed = sale_qty[s]
+            while needed > 1e-12 and available:
+                _, lot = available[0]
+                taken = min(needed, lot_remaining[lot])
+                lot_remaining[lot] -= taken
+                sale_cost[s] += taken * cost_per_share[lot]
+                needed -= taken
+                if lot_remaining[lot] <= 1e-12:
+                    heapq.heappop(available)
+
+    return lot_remaining, sale_cost
+
+
+def _recent_buys_by_security(book: Dict) -> Dict[str, np.ndarray]:
+    """Sorted purchase days per security across every account (for wash-sale checks)"""
+    buys = {}
+    for i in np.flatnonzero(book['lot_day'] > OPENING_LOT_DAY):
+        key = book['positions'][book['lot_position'][i]][1]
+        buys.setdefault(key, []).append(book['lot_day'][i])
+    return {key: np.sort(days) for key, days in buys.items()}
+
+
+def scan_tax_lots(
+    holdings: Dict,
+    transactions: Dict,
+    end_date: datetime,
+    method: str = "fifo",
+    min_harvest_loss: float = DEFAULT_MIN_HARVEST_LOSS
+) -> Dict:
+    """
+    Open lots, realized gains, harvestable losses and wash-sale flags.
+
+    Args:
+        holdings: plaid_service.get_investment_holdings() result
+        transactions: plaid_service.get_investment_transactions() result
+        end_date: Valuation date (today)
+        method: "fifo" or "specific_id"
+        min_harvest_loss: Smallest unrealized loss per lot worth reporting
+
+    Returns:
+        Per-position lot summary, realized sales, harvest opportunities, totals
+    """
+    book = build_lots(holdings, transactions, end_date, method)
+    end = book['end_date']
+    positions = book['positions']
+    lot_pos = book['lot_position']
+    remaining = book['lot_remaining']
+
+    # Unrealized gain per open lot at today's price
+    price = np.array([book['prices'].get(key, np.nan) for _, key in positions])
+    cost_per_share = np.divide(book['lot_cost'], book['lot_quantity'], out=np.zeros(len(lot_pos)), where=book['lot_quantity'] > 0)
+    open_cost = np.where(remaining > 1e-9, remaining * cost_per_share, 0.0)  # Closed lots cost nothing (even if unknown)
+    open_value = remaining * price[lot_pos]
+    unrealized = open_value - open_cost
+    held_days = -book['lot_day']
+    long_term = held_days > LONG_TERM_DAYS
+
+    buy_days = _recent_buys_by_security(book)
+
+    def buys_between(key: str, first: int, last: int) -> np.ndarray:
+        days = buy_days.get(key, np.array([], dtype=int))
+        return days[np.searchsorted(days, first, side="left"):np.searchsorted(days, last, side="right")]
+
+    # Harvest scan: open lots with a loss over the threshold
+    harvest = []
+    for i in np.flatnonzero((remaining > 1e-9) & (unrealized <= -min_harvest_loss)):
+        account_id, key = positions[lot_pos[i]]
+        # Selling today is a wash sale if the same security was bought in the last 30 days
+        # (other than this lot itself)
+        conflicts = buys_between(key, -WASH_SALE_DAYS, 0)
+        if book['lot_day'][i] >= -WASH_SALE_DAYS:
+            conflicts = np.delete(conflicts, np.searchsorted(conflicts, book['lot_day'][i]))
+        harvest.append({
+            'account_id': account_id,
+            'ticker': key,
+            'acquired': _day_label(end, book['lot_day'][i]),
+            'quantity': round(float(remaining[i]), 6),
+            'cost_per_share': round(float(cost_per_share[i]), 4),
+            'price': round(float(price[lot_pos[i]]), 4),
+            'unrealized_loss': round(float(-unrealized[i]), 2),
+            'term': 'long' if long_term[i] else 'short',
+            'wash_sale_conflict': bool(len(conflicts)),
+            'conflicting_purchases': [_day_label(end, d) for d in conflicts]
+        })
+    harvest.sort(key=lambda h: h['unrealized_loss'], reverse=True)
+
+    # Realized sales: a loss with the same security bought within 30 days either side is a wash sale
+    realized_gain = book['sale_proceeds'] - book['sale_cost']
+    sales = []
+    for j in range(len(book['sale_position'])):
+        account_id, key = positions[book['sale_position'][j]]
+        day = book['sale_day'][j]
+        replacements = buys_between(key, day - WASH_SALE_DAYS, day + WASH_SALE_DAYS)
+        replacements = replacements[replacements != day]
+        sales.append({
+            'account_id': account_id,
+            'ticker': key,
+            'date': _day_label(end, day),
+            'quantity': round(float(book['sale_quantity'][j]), 6),
+            'proceeds': round(float(book['sale_proceeds'][j]), 2),
+            'cost_basis': _rounded(book['sale_cost'][j]),
+            'gain': _rounded(realized_gain[j]),
+            'wash_sale_flag': bool(realized_gain[j] < 0 and len(replacements))
+        })
+
+    # Per-position summary from the lot arrays
+    num_positions = len(positions)
+    position_cost = np.bincount(lot_pos, weights=open_cost, minlength=num_positions)
+    position_qty = np.bincount(lot_pos, weights=remaining, minlength=num_positions)
+    position_unrealized = np.bincount(lot_pos, weights=np.where(remaining > 1e-9, unrealized, 0.0), minlength=num_positions)
+    open_lots = np.bincount(lot_pos, weights=(remaining > 1e-9).astype(float), minlength=num_positions)
+    summary = []
+    for i, (account_id, key) in enumerate(positions):
+        if position_qty[i] <= 1e-9 and book['held_quantity'][i] <= 1e-9:
+            continue
+        plaid_cost = book['plaid_cost_basis'][i]
+        summary.append({
+            'account_id': account_id,
+            'ticker': key,
+            'quantity': round(float(position_qty[i]), 6),
+            'open_lots': int(open_lots[i]),
+            'lot_cost_basis': _rounded(position_cost[i]),
+            'plaid_cost_basis': _rounded(plaid_cost),
+            'unrealized_gain': _rounded(position_unrealized[i]),
+        })
+
+    return {
+        'method': method,
+        'lots_count': int(len(lot_pos)),
+        'positions': summary,
+        'realized_sales': sales,
+        'harvest_opportunities': harvest,
+        'totals': {
+            'harvestable_loss': round(sum(h['unrealized_loss'] for h in harvest if not h['wash_sale_conflict']), 2),
+            'harvestable_loss_blocked_by_wash_sale': round(sum(h['unrealized_loss'] for h in harvest if h['wash_sale_conflict']), 2),
+            'realized_gain': round(float(np.nansum(realized_gain)), 2),
+            'sales_with_unknown_cost_basis': int(np.isnan(realized_gain).sum()),
+            'wash_sale_flags': sum(s['wash_sale_flag'] for s in sales)
+        }
+    }
+
+
+def _rounded(value: float, digits: int = 2) -> Optional[float]:
+    """Rounded dollar amount, or None if unknown (NaN)"""
+    return round(float(value), digits) if np.isfinite(value) else None
+
+
+def _day_label(end, day: int) -> Optional[str]:
+    """ISO date for a day offset from the valuation date (None for opening lots)"""
+    if day <= OPENING_LOT_DAY:
+        return None
+    return (end + timedelta(days=int(day))).isoformat()